@@ -1,15 +1,189 @@
 import os
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
+import logging
+from typing import List, Dict, Any, Deque, Optional, Tuple
+from collections import deque, OrderedDict
+from datetime import date
+import httpx
+from openai import AsyncOpenAI
+from rapidfuzz import fuzz
 from api.database import db
 from api.schemas import Task, ChatMessage
 from api.nlp_utils import nlp_utils
 from api.date_parser import date_parser
-import json
+from api.cache import SemanticCache
+from api.embeddings import EmbeddingBatcher, load_embedding_model, BATCH_SIZE
+import numpy as np
+import asyncio
+import functools
+import orjson
 import re
 
+logger = logging.getLogger(__name__)
+
+INTENT_CACHE_TTL = 3600.0
+RESPONSE_CACHE_TTL = 600.0
+FUNCTION_CACHE_TTL = 3600.0
+FUNCTION_CACHE_THRESHOLD = 0.93
+# Read-only calls are safe to replay from cache: they re-run against current data
+CACHEABLE_FUNCTIONS = ("list_tasks", "search_tasks")
+HISTORY_SIZE = 8
+HISTORY_CONTEXT = 2  # Most recent messages sent verbatim; older ones are summarized
+SUMMARY_TRIGGER = 4  # Fold the context down to HISTORY_CONTEXT once it grows past this
+MAX_SESSIONS = 1024  # Least recently active sessions are evicted beyond this
+EMBEDDING_CACHE_SIZE = 512  # Query/title text -> embedding LRU
+SESSION_CACHE_SIZE = 200  # Per-user exact-match cache entries
+SESSION_SEMANTIC_SIZE = 64  # Per-user similarity ring (64 x 384 float32 = 96 KB)
+
+_JSON_RE = re.compile(r'\{[^{}]*\}')
+_FUNC_CALL_RE = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}')
+
+# Unambiguous messages are classified locally - no LLM round-trip
+_GREETING_RE = re.compile(r'^\s*(hi|hello|hey|good\s+(morning|afternoon|evening))(\s+there)?[\s!.,]*$', re.I)
+_LIST_RE = re.compile(r'^\s*(show|list|display|view)(\s+me)?(\s+all)?(\s+my)?(\s+the)?(\s+(pending|completed|open))?\s+tasks?[\s?!.]*$', re.I)
+# Anchored on an explicit task reference: "complete the tax return by friday" or
+# "remove old files from the server" are creation requests, left to the classifier
+_DELETE_RE = re.compile(r'^\s*(delete|remove)\s+(the\s+|my\s+|this\s+|that\s+)?task\b', re.I)
+_COMPLETE_RE = re.compile(
+    r'^\s*(complete\s+(the\s+|my\s+|this\s+|that\s+)?task\b|mark\s+.+\s+(as\s+)?(done|completed?)[\s!.]*$)', re.I
+)
+
+_LOCAL_INTENTS = (
+    (_GREETING_RE, "greeting"),
+    (_LIST_RE, "task_operation"),
+    (_DELETE_RE, "task_operation"),
+    (_COMPLETE_RE, "task_operation"),
+)
+
+# Labeled phrases for the embedding prototype classifier (one mean vector per intent)
+INTENT_EXAMPLES = {
+    "greeting": [
+        "hi", "hello", "hey there", "good morning", "good evening", "hi I am pramit",
+        "hello my name is john", "hey, I'm sarah", "greetings", "hi there, nice to meet you",
+        "yo", "good afternoon", "hello again", "hey what's up", "howdy",
+    ],
+    "casual": [
+        "I work at Google", "how are you", "what can you do", "thanks", "thank you so much",
+        "that's great", "I'm feeling tired today", "tell me a joke", "who are you",
+        "what is the weather like", "I like coffee", "nice", "ok cool", "I live in Mumbai",
+        "what's your name",
+    ],
+    "task_creation": [
+        "buy flowers", "call doctor tomorrow", "urgent meeting with team next week",
+        "I need to buy groceries", "remind me to pay rent", "send email to client",
+        "finish the quarterly report by friday", "schedule dentist appointment",
+        "pick up kids from school today", "book flight tickets", "don't forget to water plants",
+        "submit assignment tomorrow high priority", "clean the kitchen", "renew passport",
+        "prepare presentation for monday",
+    ],
+    "task_operation": [
+        "show all my tasks", "list tasks", "complete buy laptop", "delete meeting",
+        "mark call mom as done", "what are my pending tasks", "show completed tasks",
+        "remove the dentist task", "search for report", "which tasks are urgent",
+        "finish task buy milk", "I finished the groceries task", "show high priority tasks",
+        "delete all done tasks", "what do I have to do today",
+    ],
+}
+INTENT_LABELS = list(INTENT_EXAMPLES)
+INTENT_HIGH_CONFIDENCE = 0.5
+INTENT_LLM_FALLBACK = 0.35  # Below this the local classifier defers to the LLM
+
+# Already-clean task titles: messages close to these need no LLM title extraction
+TASK_TITLE_EXAMPLES = [
+    "buy groceries", "call mom", "meeting with boss", "finish quarterly report",
+    "send email to client", "pay electricity bill", "book dentist appointment",
+    "pick up dry cleaning", "submit tax return", "renew car insurance", "water the plants",
+    "clean the garage", "prepare presentation", "review pull request", "order birthday cake",
+    "schedule team sync", "fix leaking tap", "return library books", "buy flowers",
+    "call doctor", "write blog post", "update resume", "walk the dog", "do laundry",
+    "plan weekend trip", "backup laptop", "reply to landlord", "cancel gym membership",
+    "cook dinner", "read chapter five",
+]
+TITLE_LOCAL_THRESHOLD = 0.4
+
+
+@functools.cache
+def _build_intent_prompt() -> str:
+    """Static classifier prefix - byte-identical every call so Groq can reuse it"""
+    return """Classify the user's intent. Reply ONLY with JSON in this exact format:
+{"intent": "greeting/casual/task_creation/task_operation", "confidence": "high/medium/low"}
+
+Intent definitions:
+- greeting: Introductions, greetings (e.g., "Hi I am John", "Hello", "Good morning")
+- casual: General conversation, statements (e.g., "I work at Google", "How are you")
+- task_creation: Creating a new task (e.g., "Buy flowers", "Call doctor tomorrow", "Meeting with boss")
+- task_operation: Operating on existing tasks (e.g., "Show all tasks", "Complete buy laptop", "Delete meeting")
+
+Now classify:
+"""
+
+
+# Static instructions first and the date last, so every request shares the longest
+# possible byte-identical prefix (Groq reuses the KV cache for repeated prefixes)
+_SYSTEM_PROMPT = """You are TaskMate, an AI assistant.
+
+For task operations:
+- list_tasks: {"function": "list_tasks", "parameters": {"status": "todo/completed", "priority": "low/medium/high/urgent"}}
+- search_tasks: {"function": "search_tasks", "parameters": {"query": "text"}}
+- delete_task: {"function": "delete_task", "parameters": {"title": "task name"}}
+- complete_task: {"function": "complete_task", "parameters": {"title": "task name"}}
+
+For greetings and casual conversation, respond naturally without JSON."""
+
+
+class UserSession:
+    """Per-user conversation state - everything else in TodoAgent is shared"""
+    
+    def __init__(self, username: str):
+        self.username = username
+        self.conversation_history: Deque[ChatMessage] = deque(maxlen=HISTORY_SIZE)
+        # LLM context: rolling one-sentence summary + the latest messages
+        self.conversation_summary = ""
+        self.context: List[ChatMessage] = []
+        self.pending_summary: List[ChatMessage] = []
+        self.summary_task: Optional[asyncio.Task] = None
+        # Replies are built from this user's context, so they are never shared across users
+        self.response_cache = SemanticCache(
+            max_size=SESSION_CACHE_SIZE, semantic_size=SESSION_SEMANTIC_SIZE, ttl=RESPONSE_CACHE_TTL
+        )
+        # message -> (function, parameters) the LLM chose for it
+        self.function_cache = SemanticCache(
+            max_size=SESSION_CACHE_SIZE, semantic_size=SESSION_SEMANTIC_SIZE,
+            threshold=FUNCTION_CACHE_THRESHOLD, ttl=FUNCTION_CACHE_TTL
+        )
+        self.reset_conversation_state()
+    
+    def add_message(self, role: str, content: str):
+        message = ChatMessage(role, content)
+        self.conversation_history.append(message)
+        self.context.append(message)
+        if len(self.context) > SUMMARY_TRIGGER:
+            self.pending_summary.extend(self.context[:-HISTORY_CONTEXT])
+            del self.context[:-HISTORY_CONTEXT]
+    
+    def cache_key(self, user_message: str) -> Tuple[str, bool]:
+        """(cache key, similarity lookup allowed) for the message just added to the context"""
+        key = SemanticCache.normalize_key(user_message)
+        if not self.conversation_summary and not self.pending_summary and len(self.context) == 1:
+            return key, True
+        # The reply depends on earlier turns: exact matches only, under the same prior context
+        prior = hash((self.conversation_summary, tuple((m.role, m.content) for m in self.context[:-1])))
+        return f"{prior:x}\0{key}", False
+    
+    def clear_history(self):
+        if self.summary_task is not None:
+            self.summary_task.cancel()
+        self.conversation_history.clear()
+        self.conversation_summary = ""
+        self.context.clear()
+        self.pending_summary.clear()
+    
+    def reset_conversation_state(self):
+        self.conversation_state = {
+            "mode": "normal",
+            "pending_task": None,
+            "original_query": None
+        }
+
 
 class TodoAgent:
     """
@@ -17,7 +191,8 @@ class TodoAgent:
     
     Architecture:
     Phase 1: Handle follow-ups (context preservation)
-    Phase 1.5: LLM Intent Classification (greeting/casual/task_creation/task_operation)
+    Phase 1.5: Intent Classification (greeting/casual/task_creation/task_operation)
+               regex fast-path -> MiniLM prototypes -> LLM fallback
     Phase 2: Based on intent - route to Python NLP or LLM
     Phase 3: Execute action
     """
@@ -25,159 +200,236 @@ class TodoAgent:
     def __init__(self):
         groq_key = os.getenv("GROQ_API_KEY")
         
-        print("🚀 Initializing AI Todo Agent v4.0 (LLM Intent Classification)")
-        self.client = OpenAI(
+        logger.info("🚀 Initializing AI Todo Agent v4.0 (LLM Intent Classification)")
+        # One pooled HTTP/2 connection multiplexes all concurrent LLM calls
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60)
+        )
+        self.client = AsyncOpenAI(
             api_key=groq_key,
-            base_url="https://api.groq.com/openai/v1"
+            base_url="https://api.groq.com/openai/v1",
+            http_client=self._http
         )
-        print("✅ Groq LLM initialized")
+        logger.info("✅ Groq LLM initialized")
         
-        print("📊 Loading RAG model...")
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        print("✅ RAG model loaded")
+        # Semantic caches: skip the Groq round-trip for repeated/near-duplicate messages
+        self._intent_cache = SemanticCache(ttl=INTENT_CACHE_TTL)
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
         
-        self.conversation_history: List[ChatMessage] = []
-        self.current_username = None
-        self.conversation_state = {
-            "mode": "normal",
-            "pending_task": None,
-            "original_query": None
-        }
+        self._sessions: "OrderedDict[str, UserSession]" = OrderedDict()
         
-    def set_username(self, username: str):
-        self.current_username = username
-        print(f"👤 User: {username}")
+    # MiniLM and everything derived from it load on first use: importing the
+    # module stays instant; call warm_up() up front (or before forking workers)
+    @functools.cached_property
+    def embedding_model(self):
+        logger.info("📊 Loading RAG model...")
+        model = load_embedding_model()
+        logger.info("✅ RAG model loaded")
+        return model
+    
+    @functools.cached_property
+    def _embedding_batcher(self) -> EmbeddingBatcher:
+        return EmbeddingBatcher(self.embedding_model)
+    
+    @functools.cached_property
+    def _intent_protos(self) -> np.ndarray:
+        return self.build_intent_prototypes()
+    
+    @functools.cached_property
+    def _title_proto(self) -> np.ndarray:
+        return self.build_prototype(TASK_TITLE_EXAMPLES)
+    
+    def warm_up(self):
+        """Load the model and prototypes now instead of on the first chat"""
+        self._intent_protos
+        self._title_proto
+    
+    async def aclose(self):
+        """Close pooled connections on shutdown"""
+        await self._http.aclose()
         
-    def reset_conversation_state(self):
-        self.conversation_state = {
-            "mode": "normal",
-            "pending_task": None,
-            "original_query": None
-        }
-        print("🔄 State reset")
+    def get_session(self, username: str) -> UserSession:
+        """Look up (or create) a user's session; LRU-evicts idle sessions past MAX_SESSIONS"""
+        session = self._sessions.get(username)
+        if session is None:
+            session = UserSession(username)
+            self._sessions[username] = session
+            if len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(username)
+        return session
+    
+    async def embed_query(self, key: str) -> np.ndarray:
+        """Normalized embedding (via the batcher), LRU-cached by text"""
+        embedding = self._embedding_cache.get(key)
+        if embedding is not None:
+            self._embedding_cache.move_to_end(key)
+            return embedding
         
-    def classify_intent(self, user_message: str) -> Dict[str, Any]:
+        embedding = await self._embedding_batcher.encode(key)
+        self._embedding_cache[key] = embedding
+        if len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+            self._embedding_cache.popitem(last=False)
+        return embedding
+    
+    def generate_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """(n, dim) normalized float32 matrix from a single forward pass"""
+        return self.embedding_model.encode(
+            texts,
+            batch_size=BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+    
+    @staticmethod
+    def mean_prototype(embeddings: np.ndarray) -> np.ndarray:
+        proto = embeddings.mean(axis=0)
+        return proto / np.linalg.norm(proto)
+    
+    def build_prototype(self, examples: List[str]) -> np.ndarray:
+        """L2-normalized mean embedding of a set of example phrases"""
+        return self.mean_prototype(self.generate_embeddings_batch(examples))
+    
+    def build_intent_prototypes(self) -> np.ndarray:
+        """(n_intents, dim) matrix of intent prototypes - every example encoded in one batch"""
+        phrases = [phrase for label in INTENT_LABELS for phrase in INTENT_EXAMPLES[label]]
+        embeddings = self.generate_embeddings_batch(phrases)
+        
+        protos = []
+        start = 0
+        for label in INTENT_LABELS:
+            end = start + len(INTENT_EXAMPLES[label])
+            protos.append(self.mean_prototype(embeddings[start:end]))
+            start = end
+        return np.stack(protos)
+    
+    async def lookup_cache(self, cache: SemanticCache, key: str, semantic: bool = True) -> Any:
+        """L1 exact match, then (if allowed) L2 semantic match"""
+        hit = cache.get_exact(key)
+        if hit is not None or not semantic:
+            return hit
+        return cache.get_similar(await self.embed_query(key))
+        
+    async def classify_intent(self, user_message: str) -> Dict[str, Any]:
         """
-        LLM Intent Classification - Fast, accurate, context-aware
+        Intent Classification: regex fast-path -> MiniLM prototypes -> LLM fallback
         Returns: {
             "intent": "greeting" | "casual" | "task_creation" | "task_operation",
             "confidence": "high" | "medium" | "low"
         }
         """
-        prompt = f"""Classify the user's intent. Reply ONLY with JSON in this exact format:
-{{"intent": "greeting/casual/task_creation/task_operation", "confidence": "high/medium/low"}}
-
-Intent definitions:
-- greeting: Introductions, greetings (e.g., "Hi I am John", "Hello", "Good morning")
-- casual: General conversation, statements (e.g., "I work at Google", "How are you")
-- task_creation: Creating a new task (e.g., "Buy flowers", "Call doctor tomorrow", "Meeting with boss")
-- task_operation: Operating on existing tasks (e.g., "Show all tasks", "Complete buy laptop", "Delete meeting")
-
-Examples:
-User: "Hi I am pramit"
-{{"intent": "greeting", "confidence": "high"}}
-
-User: "I work at Google"
-{{"intent": "casual", "confidence": "high"}}
-
-User: "Buy flowers"
-{{"intent": "task_creation", "confidence": "high"}}
+        return await self.classify_intent_local(user_message) or await self.classify_intent_llm(user_message)
 
-User: "Call doctor tomorrow"
-{{"intent": "task_creation", "confidence": "high"}}
-
-User: "urgent meeting with team next week"
-{{"intent": "task_creation", "confidence": "high"}}
-
-User: "Show all my tasks"
-{{"intent": "task_operation", "confidence": "high"}}
-
-User: "Complete buy laptop"
-{{"intent": "task_operation", "confidence": "high"}}
-
-User: "I need to buy groceries but not sure when"
-{{"intent": "task_creation", "confidence": "medium"}}
+    async def classify_intent_local(self, user_message: str) -> Optional[Dict[str, Any]]:
+        """Regex, prototype and cache stages; None when only the LLM can decide"""
+        for pattern, intent in _LOCAL_INTENTS:
+            if pattern.search(user_message):
+                logger.debug("⚡ Local intent: %s", intent)
+                return {"intent": intent, "confidence": "high"}
+        
+        cache_key = SemanticCache.normalize_key(user_message)
+        
+        # Cosine similarity to each intent prototype - sub-millisecond, no network
+        scores = self._intent_protos @ await self.embed_query(cache_key)
+        best = int(scores.argmax())
+        if scores[best] >= INTENT_LLM_FALLBACK:
+            confidence = "high" if scores[best] > INTENT_HIGH_CONFIDENCE else "low"
+            logger.debug("🎯 Intent: %s (score %.2f)", INTENT_LABELS[best], scores[best])
+            return {"intent": INTENT_LABELS[best], "confidence": confidence}
+        
+        cached = await self.lookup_cache(self._intent_cache, cache_key)
+        if cached is not None:
+            logger.debug("⚡ Intent cache hit: %s", cached.get('intent'))
+            return cached
+        
+        return None
 
-Now classify:
-User: "{user_message}"
-JSON:"""
+    async def classify_intent_llm(self, user_message: str) -> Dict[str, Any]:
+        """LLM classification for messages the local stages could not place"""
+        cache_key = SemanticCache.normalize_key(user_message)
+        prompt = _build_intent_prompt() + f'User: "{user_message}"\nJSON:'
 
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=50
+                temperature=0.0,
+                max_tokens=20,
+                response_format={"type": "json_object"}
             )
             
             content = response.choices[0].message.content.strip()
-            # Extract JSON from response
-            json_match = re.search(r'\{[^{}]*\}', content)
-            if json_match:
-                result = json.loads(json_match.group(0))
-                print(f"🎯 Intent: {result.get('intent')} (Confidence: {result.get('confidence')})")
+            # JSON mode returns a bare object; regex extraction is only a fallback
+            try:
+                result = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                json_match = _JSON_RE.search(content)
+                result = orjson.loads(json_match.group(0)) if json_match else None
+            if result:
+                logger.debug("🎯 Intent: %s (Confidence: %s)", result.get('intent'), result.get('confidence'))
+                self._intent_cache.put(cache_key, result, await self.embed_query(cache_key))
                 return result
             else:
                 raise ValueError("No JSON found in response")
                 
         except Exception as e:
-            print(f"⚠️ Intent classification failed: {e}, using fallback")
+            logger.warning("⚠️ Intent classification failed: %s, using fallback", e)
             # Fallback: use task verb detection
             if nlp_utils.has_task_intent(user_message):
                 return {"intent": "task_creation", "confidence": "low"}
             return {"intent": "casual", "confidence": "low"}
 
-    def generate_embedding(self, text: str) -> List[float]:
-        embedding = self.embedding_model.encode(text)
-        return embedding.tolist()
+    async def generate_embedding(self, text: str) -> np.ndarray:
+        """L2-normalized float32 vector (no per-float Python objects); shares the query LRU"""
+        embedding = await self.embed_query(text)
+        return embedding.astype(np.float32, copy=False)
 
     def parse_llm_response(self, response: str) -> Dict[str, Any]:
         try:
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response)
+            json_match = _FUNC_CALL_RE.search(response)
             if json_match:
                 json_str = json_match.group(0)
-                function_call = json.loads(json_str)
+                function_call = orjson.loads(json_str)
                 if "function" in function_call:
                     return {"type": "function_call", "data": function_call}
-        except:
+        except (orjson.JSONDecodeError, AttributeError):
             pass
         return {"type": "message", "data": response}
 
-    def find_task_by_title(self, title_query: str) -> Task:
-        all_tasks = db.get_all_tasks(self.current_username)
-        title_lower = title_query.lower()
+    def find_task_by_title(self, title_query: str, username: str) -> Task:
+        task = db.get_task_by_title(title_query, username)
+        if task:
+            return task
         
-        for task in all_tasks:
-            if task.title.lower() == title_lower:
-                return task
-        
-        for task in all_tasks:
-            if title_lower in task.title.lower() or task.title.lower() in title_lower:
-                return task
-        
-        for task in all_tasks:
-            if nlp_utils.fuzzy_match(title_lower, [task.title.lower()], threshold=0.7):
-                return task
+        # WRatio covers both substring (partial) and typo (Levenshtein) matches in one C++ pass
+        title = nlp_utils.fuzzy_match(title_query, db.get_task_titles(username), scorer=fuzz.WRatio)
+        if title:
+            return db.get_task_by_title(title, username)
         
         return None
 
     def get_system_prompt(self) -> str:
-        today = datetime.now().strftime("%Y-%m-%d")
-        return f"""You are TaskMate, an AI assistant. Today is {today}.
+        return self._system_prompt_for(date.today().isoformat())
 
-For task operations:
-- list_tasks: {{"function": "list_tasks", "parameters": {{"status": "todo/completed", "priority": "low/medium/high/urgent"}}}}
-- search_tasks: {{"function": "search_tasks", "parameters": {{"query": "text"}}}}
-- delete_task: {{"function": "delete_task", "parameters": {{"title": "task name"}}}}
-- complete_task: {{"function": "complete_task", "parameters": {{"title": "task name"}}}}
+    @staticmethod
+    @functools.lru_cache(maxsize=2)
+    def _system_prompt_for(today: str) -> str:
+        """Only the date varies, so the prompt is rebuilt at most once a day"""
+        return f"{_SYSTEM_PROMPT}\n\nToday is {today}."
 
-For greetings and casual conversation, respond naturally without JSON."""
-
-    def handle_incomplete_task(self, title: str, missing: List[str], original_message: str = None) -> str:
-        extracted_date = date_parser.parse_relative_date(original_message or title)
-        extracted_priority = nlp_utils.extract_priority(original_message or title)
-        
-        self.conversation_state = {
+    def handle_incomplete_task(
+        self,
+        session: UserSession,
+        title: str,
+        missing: List[str],
+        extracted_date: str = None,
+        extracted_priority: str = None,
+        original_message: str = None
+    ) -> str:
+        session.conversation_state = {
             "mode": "awaiting_info",
             "pending_task": {
                 "title": title,
@@ -195,8 +447,8 @@ For greetings and casual conversation, respond naturally without JSON."""
         elif not extracted_priority:
             return f"🎯 What priority for '{title}'?\n\n[Low] [Medium] [High] [Urgent]"
 
-    def process_followup_response(self, user_input: str) -> Dict[str, Any]:
-        pending = self.conversation_state.get("pending_task", {})
+    async def process_followup_response(self, session: UserSession, user_input: str) -> Dict[str, Any]:
+        pending = session.conversation_state.get("pending_task", {})
         
         extracted_date = date_parser.parse_relative_date(user_input)
         extracted_priority = nlp_utils.extract_priority(user_input)
@@ -207,37 +459,38 @@ For greetings and casual conversation, respond naturally without JSON."""
         if extracted_priority and not pending.get("priority"):
             pending["priority"] = extracted_priority
         
-        self.conversation_state["pending_task"] = pending
+        session.conversation_state["pending_task"] = pending
         
         if pending.get("due_date") and pending.get("priority"):
-            return self.create_task_from_pending()
+            return await self.create_task_from_pending(session)
         
         if not pending.get("due_date"):
             return {"type": "ask_more", "message": "📅 When?"}
         elif not pending.get("priority"):
             return {"type": "ask_more", "message": "🎯 Priority?"}
 
-    def create_task_from_pending(self) -> Dict[str, Any]:
-        pending = self.conversation_state.get("pending_task", {})
-        result = self.execute_function("create_task", pending)
-        self.reset_conversation_state()
+    async def create_task_from_pending(self, session: UserSession) -> Dict[str, Any]:
+        pending = session.conversation_state.get("pending_task", {})
+        result = await self.execute_function(session.username, "create_task", pending)
+        session.reset_conversation_state()
+        logger.debug("🔄 State reset")
         return {"type": "complete", "result": result}
 
-    def execute_function(self, function_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    async def execute_function(self, username: str, function_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         try:
             if function_name == "create_task":
                 title = parameters.get("title")
                 if not title:
                     return {"success": False, "error": "Title required"}
                 
-                existing_task = self.find_task_by_title(title)
+                existing_task = self.find_task_by_title(title, username)
                 if existing_task and existing_task.status != "completed":
                     return {"success": False, "error": f"Task '{title}' exists"}
                 
-                embedding = self.generate_embedding(title)
+                embedding = await self.generate_embedding(title)
                 task = db.create_task(
                     title=title,
-                    username=self.current_username,
+                    username=username,
                     priority=parameters.get("priority") or "medium",
                     due_date=parameters.get("due_date"),
                     embedding=embedding
@@ -251,134 +504,226 @@ For greetings and casual conversation, respond naturally without JSON."""
             
             elif function_name == "list_tasks":
                 tasks = db.search_tasks(
-                    username=self.current_username,
+                    username=username,
                     status=parameters.get("status"),
                     priority=parameters.get("priority")
                 )
-                return {"success": True, "tasks": [t.to_dict() for t in tasks], "count": len(tasks)}
+                return {"success": True, "tasks": tasks, "count": len(tasks)}
+            
+            elif function_name == "search_tasks":
+                tasks = db.search_tasks(username=username, query=parameters.get("query"))
+                return {"success": True, "tasks": tasks, "count": len(tasks)}
             
             elif function_name == "complete_task":
                 title = parameters.get("title")
-                task = self.find_task_by_title(title)
+                task = self.find_task_by_title(title, username)
                 if not task:
                     return {"success": False, "error": f"Task '{title}' not found"}
                 
-                updated = db.update_task(task.id, self.current_username, status="completed")
+                updated = db.update_task(task.id, username, status="completed")
                 return {"success": True, "message": f"✅ Completed: '{updated.title}'"}
             
             elif function_name == "delete_task":
                 title = parameters.get("title")
-                task = self.find_task_by_title(title)
+                task = self.find_task_by_title(title, username)
                 if not task:
                     return {"success": False, "error": f"Task '{title}' not found"}
                 
-                db.delete_task(task.id, self.current_username)
+                db.delete_task(task.id, username)
                 return {"success": True, "message": f"🗑️ Deleted: '{task.title}'"}
             
         except Exception as e:
-            print(f"❌ Error: {e}")
+            logger.exception("❌ Error executing %s: %s", function_name, e)
             return {"success": False, "error": str(e)}
 
-    def handle_llm_conversation(self, user_message: str) -> str:
+    def schedule_summary(self, session: UserSession):
+        """Summarize messages that left the context window, off the request path"""
+        if session.pending_summary and (session.summary_task is None or session.summary_task.done()):
+            session.summary_task = asyncio.create_task(self.update_summary(session))
+
+    async def update_summary(self, session: UserSession):
+        while session.pending_summary:
+            batch, session.pending_summary = session.pending_summary, []
+            transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in batch)
+            prompt = (
+                f"Summary so far: {session.conversation_summary or 'none'}\n\n"
+                f"New messages:\n{transcript}\n\n"
+                "Summarize the whole conversation in one sentence."
+            )
+            try:
+                completion = await self.client.chat.completions.create(
+                    model="llama-3.1-8b-instant",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.0,
+                    max_tokens=80
+                )
+                session.conversation_summary = completion.choices[0].message.content.strip()
+            except Exception as e:
+                logger.warning("⚠️ Summary update failed: %s", e)
+                return
+
+    def format_function_result(self, result: Dict[str, Any]) -> str:
+        if not result.get("success"):
+            return f"❌ {result.get('error')}"
+        
+        final_response = result.get("message", "Done!")
+        tasks = result.get("tasks")
+        if tasks:
+            final_response = f"📋 {len(tasks)} task(s):\n"
+            for i, t in enumerate(tasks[:10], 1):
+                emoji = "✅" if t.status == 'completed' else "📝"
+                final_response += f"\n{i}. {emoji} {t.title}"
+        return final_response
+
+    async def stream_completion(self, messages: List[Dict[str, str]]) -> str:
+        """Stream the reply, hanging up as soon as a complete function-call JSON has arrived"""
+        stream = await self.client.chat.completions.create(
+            model="llama-3.1-8b-instant",
+            messages=messages,
+            temperature=0.3,
+            max_tokens=400,
+            stream=True
+        )
+        
+        parts = []
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                parts.append(delta)
+                # A JSON object can only complete on a chunk carrying a closing brace
+                if "}" in delta:
+                    text = "".join(parts)
+                    if self.parse_llm_response(text)["type"] == "function_call":
+                        return text
+        finally:
+            await stream.close()
+        
+        return "".join(parts)
+
+    async def handle_llm_conversation(self, session: UserSession, user_message: str) -> str:
         """Handle natural conversation and task operations via LLM"""
-        self.clear_old_context()
-        self.conversation_history.append(ChatMessage("user", user_message))
+        session.add_message("user", user_message)
+        
+        # Only plain replies are cached - function calls mutate the DB and must re-run
+        cache_key, semantic = session.cache_key(user_message)
+        cached = await self.lookup_cache(session.response_cache, cache_key, semantic)
+        if cached is not None:
+            logger.debug("⚡ Response cache hit")
+            session.add_message("assistant", cached)
+            return cached
+        
+        # "list tasks" ~ "show all tasks": skip the LLM, replay its function call on fresh data
+        call = await self.lookup_cache(session.function_cache, cache_key, semantic)
+        if call is not None:
+            logger.debug("⚡ Function cache hit: %s", call[0])
+            result = await self.execute_function(session.username, call[0], call[1])
+            final_response = self.format_function_result(result)
+            session.add_message("assistant", final_response)
+            return final_response
         
         messages = [{"role": "system", "content": self.get_system_prompt()}]
-        for msg in self.conversation_history[-6:]:
+        if session.conversation_summary:
+            messages.append({"role": "system", "content": f"Prior context: {session.conversation_summary}"})
+        for msg in session.context:
             messages.append({"role": msg.role, "content": msg.content})
         
         try:
-            completion = self.client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=messages,
-                temperature=0.3,
-                max_tokens=400
-            )
-            
-            llm_response = completion.choices[0].message.content
+            llm_response = await self.stream_completion(messages)
             parsed = self.parse_llm_response(llm_response)
             
             if parsed["type"] == "function_call":
-                result = self.execute_function(
-                    parsed["data"].get("function"),
-                    parsed["data"].get("parameters", {})
-                )
+                function_name = parsed["data"].get("function")
+                parameters = parsed["data"].get("parameters", {})
+                result = await self.execute_function(session.username, function_name, parameters)
+                final_response = self.format_function_result(result)
                 
-                if result.get("success"):
-                    final_response = result.get("message", "Done!")
-                    if "tasks" in result:
-                        tasks = result["tasks"]
-                        if len(tasks) > 0:
-                            final_response = f"📋 {len(tasks)} task(s):\n"
-                            for i, t in enumerate(tasks[:10], 1):
-                                emoji = "✅" if t['status'] == 'completed' else "📝"
-                                final_response += f"\n{i}. {emoji} {t['title']}"
-                else:
-                    final_response = f"❌ {result.get('error')}"
+                if function_name in CACHEABLE_FUNCTIONS and result.get("success"):
+                    # Parameters lifted from the message ("completed", "gym") only replay for
+                    # the exact same message; a near-duplicate may differ in just that word
+                    similar_ok = semantic and not any(parameters.values())
+                    session.function_cache.put(
+                        cache_key, (function_name, parameters),
+                        await self.embed_query(cache_key) if similar_ok else None
+                    )
             else:
                 final_response = parsed["data"].strip()
+                session.response_cache.put(
+                    cache_key, final_response, await self.embed_query(cache_key) if semantic else None
+                )
             
-            self.conversation_history.append(ChatMessage("assistant", final_response))
+            session.add_message("assistant", final_response)
+            self.schedule_summary(session)
             return final_response
             
         except Exception as e:
             return f"Error: {str(e)}"
 
-    def clear_old_context(self):
-        if len(self.conversation_history) > 8:
-            self.conversation_history = self.conversation_history[-8:]
-
-    def chat(self, user_message: str) -> str:
+    async def chat(self, username: str, user_message: str) -> str:
         """
         MAIN INTERFACE - Production Version with LLM Intent Classification
         """
-        if not self.current_username:
+        if not username:
             return "Error: No user authenticated"
         
-        print(f"\n{'='*60}")
-        print(f"💬 User: {user_message}")
-        print(f"{'='*60}")
+        session = self.get_session(username)
+        
+        logger.debug("💬 %s: %s", username, user_message)
         
         # PHASE 1: Handle follow-ups
-        if self.conversation_state.get("mode") == "awaiting_info":
-            followup_result = self.process_followup_response(user_message)
+        if session.conversation_state.get("mode") == "awaiting_info":
+            followup_result = await self.process_followup_response(session, user_message)
             if followup_result["type"] == "ask_more":
                 return followup_result["message"]
             elif followup_result["type"] == "complete":
                 result = followup_result["result"]
                 return result.get("message") if result.get("success") else f"❌ {result.get('error')}"
         
-        # PHASE 1.5: LLM Intent Classification
-        print("🎯 Classifying intent...")
-        intent_result = self.classify_intent(user_message)
+        # PHASE 1.5: Intent Classification
+        # Messages that don't already look like a clean task title need LLM title
+        # extraction if they turn out to be tasks
+        logger.debug("🎯 Classifying intent...")
+        query_embedding = await self.embed_query(SemanticCache.normalize_key(user_message))
+        needs_llm_title = float(self._title_proto @ query_embedding) <= TITLE_LOCAL_THRESHOLD
+        title_task = None
+        intent_result = await self.classify_intent_local(user_message)
+        if intent_result is None:
+            # An intent round-trip is unavoidable now: overlap the title one with it
+            if needs_llm_title:
+                title_task = asyncio.create_task(nlp_utils.extract_task_title_llm(user_message, self.client))
+            intent_result = await self.classify_intent_llm(user_message)
         intent = intent_result.get("intent", "casual")
         
+        if intent != "task_creation" and title_task:
+            title_task.cancel()
+        
         # PHASE 2: Route based on intent
         if intent in ["greeting", "casual", "task_operation"]:
-            print(f"💬 {intent.title()} - using LLM")
-            return self.handle_llm_conversation(user_message)
+            logger.debug("💬 %s - using LLM", intent)
+            return await self.handle_llm_conversation(session, user_message)
         
         # PHASE 3: Task creation via Python NLP
         if intent == "task_creation":
-            print("📋 Task creation - using Python NLP")
+            logger.debug("📋 Task creation - using Python NLP")
             
             extracted_date = date_parser.parse_relative_date(user_message)
             extracted_priority = nlp_utils.extract_priority(user_message)
             
-            word_count = len(user_message.split())
-            if word_count > 10:
-                clean_title = nlp_utils.extract_task_title_llm(user_message, self.client)
+            if title_task:
+                clean_title = await title_task
+            elif needs_llm_title:
+                clean_title = await nlp_utils.extract_task_title_llm(user_message, self.client)
             else:
                 clean_title = nlp_utils.extract_task_title(user_message)
             
             if not clean_title:
                 return "❌ Could not extract task title"
             
-            print(f"📊 Extracted - Title: '{clean_title}', Date: {extracted_date}, Priority: {extracted_priority}")
+            logger.debug("📊 Extracted - Title: '%s', Date: %s, Priority: %s", clean_title, extracted_date, extracted_priority)
             
             if extracted_date and extracted_priority:
-                result = self.execute_function("create_task", {
+                result = await self.execute_function(username, "create_task", {
                     "title": clean_title,
                     "due_date": extracted_date,
                     "priority": extracted_priority
@@ -391,10 +736,10 @@ For greetings and casual conversation, respond naturally without JSON."""
             if not extracted_priority:
                 missing.append("priority")
             
-            return self.handle_incomplete_task(clean_title, missing, user_message)
+            return self.handle_incomplete_task(session, clean_title, missing, extracted_date, extracted_priority, user_message)
         
         # Fallback
-        return self.handle_llm_conversation(user_message)
+        return await self.handle_llm_conversation(session, user_message)
 
 
 # Global instance
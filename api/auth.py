@@ -2,9 +2,13 @@ import os
 import jwt
 import bcrypt
 import re
+import time
+import sqlite3
+from threading import Lock
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-import json
+from typing import Optional, Dict, Tuple
+import orjson
 
 try:
     import dns.resolver
@@ -12,16 +16,68 @@ try:
 except ImportError:
     DNS_AVAILABLE = False
 
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+
+if DNS_AVAILABLE:
+    # One shared resolver (parses resolv.conf once); bounded so signup can't hang on DNS
+    _resolver = dns.resolver.Resolver()
+    _resolver.timeout = 2
+    _resolver.lifetime = 3
+
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 24 * 60  # 24 hours
+MX_CACHE_TTL = 3600  # 1 hour
+# Verified tokens skip the JWT decode for this long (also bounds staleness after expiry)
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 10_000
+
+# bcrypt cost: each +1 doubles hash/verify time (library default 12 is ~250ms)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+# "bcrypt" or "argon2" (needs argon2-cffi); existing hashes verify either way
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "bcrypt")
+
+if PASSWORD_HASHER == "argon2" and not ARGON2_AVAILABLE:
+    # Fail at startup rather than quietly hashing new passwords with bcrypt
+    raise RuntimeError("PASSWORD_HASHER=argon2 requires argon2-cffi (pip install argon2-cffi)")
+
+if ARGON2_AVAILABLE:
+    _argon2 = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# domain -> (has MX records, checked_at)
+_mx_cache: Dict[str, Tuple[bool, float]] = {}
+
+# token -> (payload, valid_until), LRU order; only successful verifications are cached
+_token_cache: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+_token_cache_lock = Lock()
+
+
+def domain_has_mx(domain: str) -> bool:
+    """MX lookup memoized per domain; timeouts aren't cached so they get retried"""
+    hit = _mx_cache.get(domain)
+    if hit and time.monotonic() - hit[1] < MX_CACHE_TTL:
+        return hit[0]
+    
+    try:
+        result = len(_resolver.resolve(domain, 'MX')) > 0
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        result = False
+    
+    _mx_cache[domain] = (result, time.monotonic())
+    return result
 
 
 def is_valid_email(email: str) -> bool:
     """Validate email format and check if domain has MX records"""
     # Basic format check
-    email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_regex, email):
+    if not _EMAIL_RE.match(email):
         return False
     
     # Extract domain
@@ -31,9 +87,8 @@ def is_valid_email(email: str) -> bool:
         # Check if domain has valid MX records (mail servers)
         if DNS_AVAILABLE:
             try:
-                mx_records = dns.resolver.resolve(domain, 'MX')
-                return len(mx_records) > 0
-            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.Timeout):
+                return domain_has_mx(domain)
+            except dns.resolver.Timeout:
                 return False
         else:
             # If DNS not available, just validate format
@@ -45,33 +100,75 @@ def is_valid_email(email: str) -> bool:
 
 
 class AuthService:
-    def __init__(self, users_file: str = "users.json"):
-        self.users_file = users_file
-        self.users = self.load_users()
+    """Users live in SQLite: O(1) inserts and indexed username/email lookups"""
     
-    def load_users(self):
-        """Load users from JSON file"""
-        if os.path.exists(self.users_file):
-            try:
-                with open(self.users_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+    def __init__(self, users_db: str = "users.db", users_file: str = "users.json"):
+        self.users_db = users_db
+        self._lock = Lock()  # One connection shared by the threadpool
+        self.conn = sqlite3.connect(users_db, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                password_hash TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users(email)")
+        self.migrate_json_users(users_file)
+    
+    def migrate_json_users(self, users_file: str):
+        """One-shot import of a legacy users.json; the file is renamed afterwards"""
+        if not os.path.exists(users_file):
+            return
+        
+        try:
+            with open(users_file, 'rb') as f:
+                users = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError) as e:
+            print(f"❌ Could not migrate {users_file}: {e}")
+            return
+        
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO users (username, email, password_hash, created_at) VALUES (?, ?, ?, ?)",
+                [(u["username"], u["email"], u["password"], u["created_at"]) for u in users.values()]
+            )
+        os.replace(users_file, f"{users_file}.migrated")
+        print(f"📦 Migrated {len(users)} users from {users_file} to {self.users_db}")
+    
+    def get_user(self, username: str) -> Optional[dict]:
+        """User record (password is the stored hash) or None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT username, email, password_hash AS password, created_at FROM users WHERE username = ?",
+                (username,)
+            ).fetchone()
+        return dict(row) if row else None
     
-    def save_users(self):
-        """Save users to JSON file"""
-        with open(self.users_file, 'w') as f:
-            json.dump(self.users, f, indent=2)
+    def email_exists(self, email: str) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM users WHERE email = ? LIMIT 1", (email,)).fetchone() is not None
     
     def hash_password(self, password: str) -> str:
-        """Hash password with bcrypt"""
-        salt = bcrypt.gensalt()
+        """Hash password with argon2id if configured, otherwise bcrypt"""
+        if PASSWORD_HASHER == "argon2":
+            return _argon2.hash(password)
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
     def verify_password(self, password: str, hashed: str) -> bool:
-        """Verify password against hash"""
+        """Verify password against hash (dispatches on the hash prefix)"""
+        if hashed.startswith("$argon2"):
+            if not ARGON2_AVAILABLE:
+                return False
+            try:
+                return _argon2.verify(hashed, password)
+            except (VerificationError, InvalidHashError):
+                return False
         return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
     
     def create_user(self, username: str, email: str, password: str) -> dict:
@@ -85,29 +182,30 @@ class AuthService:
             }
         
         # Check if username exists
-        if username in self.users:
+        if self.get_user(username):
             return {"success": False, "error": "Username already exists"}
         
-        # Check if email exists
-        if any(u.get("email") == email for u in self.users.values()):
+        # Check if email exists (unique index lookup)
+        if self.email_exists(email):
             return {"success": False, "error": "Email already exists"}
         
         # Create user
-        user_data = {
-            "username": username,
-            "email": email,
-            "password": self.hash_password(password),
-            "created_at": datetime.now().isoformat()
-        }
-        
-        self.users[username] = user_data
-        self.save_users()
+        try:
+            password_hash = self.hash_password(password)
+            with self._lock:
+                self.conn.execute(
+                    "INSERT INTO users (username, email, password_hash, created_at) VALUES (?, ?, ?, ?)",
+                    (username, email, password_hash, datetime.now().isoformat())
+                )
+        except sqlite3.IntegrityError:
+            # Lost a race with a concurrent signup
+            return {"success": False, "error": "Username or email already exists"}
         
         return {"success": True, "message": "User created successfully"}
     
     def authenticate_user(self, username: str, password: str) -> Optional[str]:
         """Authenticate user and return JWT token"""
-        user = self.users.get(username)
+        user = self.get_user(username)
         if not user:
             return None
         
@@ -126,13 +224,28 @@ class AuthService:
     
     def verify_token(self, token: str) -> Optional[dict]:
         """Verify JWT token and return user data"""
+        now = time.monotonic()
+        with _token_cache_lock:
+            hit = _token_cache.get(token)
+            if hit and now < hit[1]:
+                _token_cache.move_to_end(token)
+                return hit[0]
+        
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
+        
+        # Never cache past the token's own expiry
+        ttl = min(TOKEN_CACHE_TTL, payload.get("exp", float("inf")) - time.time())
+        with _token_cache_lock:
+            _token_cache[token] = (payload, now + ttl)
+            _token_cache.move_to_end(token)
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+        return payload
 
 
 auth_service = AuthService()
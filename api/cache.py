@@ -0,0 +1,98 @@
+"""
+Response caches for AI Todo System
+Features:
+- L1 exact-match LRU keyed by normalized text
+- L2 semantic lookup by cosine similarity over normalized embeddings
+- TTL expiry on both levels (monotonic clock)
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Optional, List, Tuple
+import numpy as np
+
+
+class SemanticCache:
+    """Two-level cache: exact LRU in front of an embedding-similarity ring buffer"""
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        semantic_size: int = 256,
+        threshold: float = 0.95,
+        ttl: float = 3600.0
+    ):
+        self.max_size = max_size
+        self.semantic_size = semantic_size
+        self.threshold = threshold
+        self.ttl = ttl
+
+        # L1: key -> (timestamp, value)
+        self._exact_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+        # L2: ring buffer of normalized embeddings + parallel (timestamp, value) slots
+        self._sem_matrix: Optional[np.ndarray] = None
+        self._sem_entries: List[Optional[Tuple[float, Any]]] = [None] * semantic_size
+        self._sem_next = 0
+        self._sem_count = 0
+
+    @staticmethod
+    def normalize_key(text: str) -> str:
+        return text.strip().lower()
+
+    def _is_fresh(self, ts: float) -> bool:
+        return time.monotonic() - ts < self.ttl
+
+    def get_exact(self, key: str) -> Optional[Any]:
+        """L1 lookup - O(1)"""
+        entry = self._exact_cache.get(key)
+        if entry is None:
+            return None
+
+        ts, value = entry
+        if not self._is_fresh(ts):
+            del self._exact_cache[key]
+            return None
+
+        self._exact_cache.move_to_end(key)
+        return value
+
+    def get_similar(self, embedding: np.ndarray) -> Optional[Any]:
+        """L2 lookup - one matmul against all cached embeddings"""
+        if self._sem_count == 0:
+            return None
+
+        sims = self._sem_matrix[:self._sem_count] @ embedding
+        idx = int(sims.argmax())
+        if sims[idx] <= self.threshold:
+            return None
+
+        ts, value = self._sem_entries[idx]
+        if not self._is_fresh(ts):
+            return None
+        return value
+
+    def put(self, key: str, value: Any, embedding: Optional[np.ndarray] = None):
+        """Store in L1, and in L2 when an embedding is given"""
+        now = time.monotonic()
+
+        self._exact_cache[key] = (now, value)
+        self._exact_cache.move_to_end(key)
+        if len(self._exact_cache) > self.max_size:
+            self._exact_cache.popitem(last=False)
+
+        if embedding is None:
+            return
+
+        if self._sem_matrix is None:
+            self._sem_matrix = np.zeros((self.semantic_size, embedding.shape[0]), dtype=np.float32)
+
+        self._sem_matrix[self._sem_next] = embedding
+        self._sem_entries[self._sem_next] = (now, value)
+        self._sem_next = (self._sem_next + 1) % self.semantic_size
+        self._sem_count = min(self._sem_count + 1, self.semantic_size)
+
+    def clear(self):
+        self._exact_cache.clear()
+        self._sem_entries = [None] * self.semantic_size
+        self._sem_next = 0
+        self._sem_count = 0
@@ -1,56 +1,265 @@
-import json
+import atexit
+import logging
+import orjson
 import os
 import uuid
-from typing import List, Optional, Dict, Any
+import base64
+import sys
+import numpy as np
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
-from api.schemas import Task
-from threading import Lock
+from api.schemas import Task, TASK_PUBLIC_FIELDS
+from threading import Lock, Timer
+
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CAPACITY = 1024  # Initial sidecar rows; doubled whenever it fills up
+SAVE_DELAY = 1.0  # Seconds; mutations inside this window share one write
+# Sidecar precision: unit vectors lose nothing measurable for ranking at half precision,
+# and the file / page cache footprint halves. Cast to float32 once per user matrix build.
+EMBEDDING_DTYPE = "float16"
+# Fields a client may change through update_task
+UPDATABLE_FIELDS = ("title", "description", "priority", "status", "due_date", "category")
+# Low-cardinality values shared across thousands of records: one interned object each
+INTERNED_FIELDS = ("status", "priority", "category")
+
+
+def decode_embedding(value):
+    """Legacy inline embedding (JSON float list or base64 float32) -> ndarray"""
+    if isinstance(value, list):
+        return np.asarray(value, dtype=np.float32)
+    return np.frombuffer(base64.b64decode(value), dtype=np.float32)
+
+
+def normalize_embedding(embedding):
+    """Unit-length float32 copy, so cosine similarity is a plain dot product"""
+    vector = np.array(embedding, dtype=np.float32)
+    # sqrt(dot) is one BLAS call; linalg.norm adds ord/axis dispatch on every query
+    vector /= np.sqrt(np.dot(vector, vector)) + 1e-12
+    return vector
 
 
 class Database:
     """
     Enterprise-grade database with thread-safe operations
-    Features: Write-through caching, automatic reload, thread safety
+    Features: Write-behind (debounced) saves, automatic reload, thread safety
+    Embeddings live in a binary .npy sidecar (memmap); tasks only store their row index
     """
     
     def __init__(self, tasks_file: str = "tasks.json"):
         self.tasks_file = tasks_file
+        self.embeddings_file = f"{os.path.splitext(tasks_file)[0]}.embeddings.npy"
         self.tasks: Dict[str, dict] = {}
         self._lock = Lock()  # Thread safety
+        self._dirty = False  # In-memory changes not yet on disk
+        self._save_timer: Optional[Timer] = None
+        self._file_stamp: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the last load/save
+        # username -> ((N, D) float32 matrix of unit rows, task ids); dropped per user on write
+        self._emb_index: Dict[str, Tuple[Any, List[str]]] = {}
+        # username -> {task_id: task_data} (same dicts as self.tasks)
+        self._user_tasks: Dict[str, Dict[str, dict]] = {}
+        # task_id -> lowercased "title\0description", built once per write instead of per search
+        self._search_text: Dict[str, str] = {}
+        # username -> lowercased title -> task ids (insertion order)
+        self._by_user_lower_title: Dict[str, Dict[str, List[str]]] = {}
+        self._emb_mmap = None  # (capacity, D) EMBEDDING_DTYPE memmap over embeddings_file
+        self._free_rows: List[int] = []
+        # Rows of deleted tasks: reusable only once tasks.json no longer references them
+        self._released_rows: List[int] = []
+        self._next_row = 0
         self.load_tasks()
+        atexit.register(self.flush)
+    
+    def _open_embeddings(self):
+        if os.path.exists(self.embeddings_file):
+            self._emb_mmap = np.lib.format.open_memmap(self.embeddings_file, mode="r+")
+            if self._emb_mmap.dtype != EMBEDDING_DTYPE:
+                # Sidecars written before the switch were float32: convert once in place
+                self._rewrite_embeddings(self._emb_mmap.shape[0])
+                logger.info("✅ Converted embedding store to %s", EMBEDDING_DTYPE)
+    
+    def _rewrite_embeddings(self, capacity: int):
+        """Copy the sidecar into a new EMBEDDING_DTYPE file of the given capacity and swap it in"""
+        
+        temp_file = f"{self.embeddings_file}.tmp"
+        rewritten = np.lib.format.open_memmap(
+            temp_file, mode="w+", dtype=EMBEDDING_DTYPE, shape=(capacity, self._emb_mmap.shape[1])
+        )
+        rewritten[:self._emb_mmap.shape[0]] = self._emb_mmap
+        rewritten.flush()
+        del rewritten
+        self._emb_mmap = None
+        os.replace(temp_file, self.embeddings_file)
+        self._open_embeddings()
+    
+    def _index_rows(self):
+        """Rebuild the row allocator from the rows referenced by tasks"""
+        used = {t["embedding_row"] for t in self.tasks.values() if t.get("embedding_row") is not None}
+        self._next_row = max(used) + 1 if used else 0
+        self._free_rows = [row for row in range(self._next_row) if row not in used]
+        self._released_rows = []
+    
+    def _alloc_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        row = self._next_row
+        self._next_row += 1
+        return row
+    
+    def _write_embedding(self, row: int, vector):
+        """Write a unit-length vector into the sidecar, creating/growing it as needed"""
+        
+        if self._emb_mmap is None:
+            self._emb_mmap = np.lib.format.open_memmap(
+                self.embeddings_file, mode="w+", dtype=EMBEDDING_DTYPE,
+                shape=(max(EMBEDDING_CAPACITY, row + 1), vector.shape[0])
+            )
+        elif row >= self._emb_mmap.shape[0]:
+            capacity = self._emb_mmap.shape[0]
+            while capacity <= row:
+                capacity *= 2
+            self._rewrite_embeddings(capacity)
+            logger.info("📈 Grew embedding store to %d rows", capacity)
+        
+        self._emb_mmap[row] = vector
     
     def load_tasks(self):
         """Load tasks from JSON file with error handling"""
+        migrated = False
         with self._lock:
+            if self._dirty:
+                return  # Memory is newer than the file until the pending save lands
+            self._file_stamp = self._stat_tasks_file()
+            # Another writer may have grown (replaced) the sidecar: never keep a stale map
+            self._emb_mmap = None
+            self._open_embeddings()
             if os.path.exists(self.tasks_file):
                 try:
-                    with open(self.tasks_file, 'r') as f:
-                        self.tasks = json.load(f)
-                    print(f"✅ Loaded {len(self.tasks)} tasks from {self.tasks_file}")
-                except json.JSONDecodeError as e:
-                    print(f"❌ JSON decode error: {e}")
+                    with open(self.tasks_file, 'rb') as f:
+                        self.tasks = orjson.loads(f.read())
+                    self._index_rows()
+                    migrated = self._migrate_embeddings()
+                    logger.info("✅ Loaded %d tasks from %s", len(self.tasks), self.tasks_file)
+                except orjson.JSONDecodeError as e:
+                    logger.error("❌ JSON decode error: %s", e)
                     self.tasks = {}
                 except Exception as e:
-                    print(f"❌ Error loading tasks: {e}")
+                    logger.error("❌ Error loading tasks: %s", e)
                     self.tasks = {}
             else:
                 self.tasks = {}
-                print(f"📝 No existing tasks file, starting fresh")
+                logger.info("📝 No existing tasks file, starting fresh")
+            self._index_users()
+            self._emb_index = {}
+        
+        if migrated:
+            self.save_tasks()
+    
+    def _stat_tasks_file(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.tasks_file)
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+    
+    def _maybe_reload(self):
+        """Memory is authoritative; re-read only if tasks.json was changed by someone else"""
+        if self._stat_tasks_file() != self._file_stamp:
+            self.load_tasks()
+    
+    def _index_users(self):
+        """Rebuild the per-user task and title indexes"""
+        self._user_tasks = {}
+        self._by_user_lower_title = {}
+        self._search_text = {}
+        for task_id, task_data in self.tasks.items():
+            self._intern_fields(task_data)
+            self._user_tasks.setdefault(task_data["username"], {})[task_id] = task_data
+            self._search_text[task_id] = self._make_search_text(task_data)
+            self._add_title(task_data["username"], task_data["title"], task_id)
+    
+    @staticmethod
+    def _intern_fields(task_data: dict):
+        # JSON-decoded values are fresh strings; interned ones share memory and let
+        # the status/priority filters match on identity before comparing characters
+        for field in INTERNED_FIELDS:
+            value = task_data.get(field)
+            if isinstance(value, str):
+                task_data[field] = sys.intern(value)
+    
+    @staticmethod
+    def _make_search_text(task_data: dict) -> str:
+        # NUL separator: a query can't match across the title/description boundary
+        return f"{task_data['title']}\0{task_data.get('description') or ''}".lower()
+    
+    def _add_title(self, username: str, title: str, task_id: str):
+        self._by_user_lower_title.setdefault(username, {}).setdefault(title.lower(), []).append(task_id)
+    
+    def _remove_title(self, username: str, title: str, task_id: str):
+        bucket = self._by_user_lower_title.get(username, {})
+        task_ids = bucket.get(title.lower(), [])
+        if task_id in task_ids:
+            task_ids.remove(task_id)
+            if not task_ids:
+                del bucket[title.lower()]
+    
+    def _migrate_embeddings(self) -> bool:
+        """One-shot move of legacy inline embeddings into the sidecar; True if anything moved"""
+        migrated = False
+        for task_data in self.tasks.values():
+            if "embedding" not in task_data:
+                continue
+            embedding = task_data.pop("embedding")
+            migrated = True
+            if embedding:
+                row = self._alloc_row()
+                self._write_embedding(row, normalize_embedding(decode_embedding(embedding)))
+                task_data["embedding_row"] = row
+        return migrated
+    
+    def _schedule_save(self):
+        """Mark dirty and start the write-behind timer if one isn't already pending"""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = Timer(SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def flush(self):
+        """Write pending changes now (timer callback, shutdown)"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+        self.save_tasks()
     
     def save_tasks(self):
         """Thread-safe save with atomic write"""
         with self._lock:
             try:
+                # Rows referenced by the JSON must hit disk first
+                if self._emb_mmap is not None:
+                    self._emb_mmap.flush()
+                
                 # Write to temporary file first (atomic operation)
                 temp_file = f"{self.tasks_file}.tmp"
-                with open(temp_file, 'w') as f:
-                    json.dump(self.tasks, f, indent=2)
+                with open(temp_file, 'wb') as f:
+                    f.write(orjson.dumps(self.tasks, option=orjson.OPT_INDENT_2))
                 
                 # Rename to actual file (atomic on POSIX systems)
                 os.replace(temp_file, self.tasks_file)
-                print(f"💾 Saved {len(self.tasks)} tasks to {self.tasks_file}")
+                self._file_stamp = self._stat_tasks_file()
+                self._dirty = False
+                # The deletes are on disk now, so overwriting their rows can't corrupt it
+                self._free_rows.extend(self._released_rows)
+                self._released_rows = []
+                logger.debug("💾 Saved %d tasks to %s", len(self.tasks), self.tasks_file)
             except Exception as e:
-                print(f"❌ Error saving tasks: {e}")
+                logger.error("❌ Error saving tasks: %s", e)
                 # Clean up temp file if exists
                 if os.path.exists(temp_file):
                     os.remove(temp_file)
@@ -64,10 +273,11 @@ class Database:
         due_date: Optional[str] = None,
         category: Optional[str] = None,
         tags: Optional[List[str]] = None,
-        embedding: Optional[List[float]] = None
+        embedding=None
     ) -> Task:
         """Create a new task with timestamps"""
-        task_id = str(uuid.uuid4())
+        self._maybe_reload()
+        task_id = uuid.uuid4().hex
         now = datetime.now().isoformat()
         
         task_data = {
@@ -80,23 +290,31 @@ class Database:
             "due_date": due_date,
             "category": category,
             "tags": tags or [],
-            "embedding": embedding,
+            "embedding_row": None,
             "created_at": now,
             "updated_at": now
         }
+        self._intern_fields(task_data)
         
         with self._lock:
+            if embedding is not None:
+                task_data["embedding_row"] = self._alloc_row()
+                self._write_embedding(task_data["embedding_row"], normalize_embedding(embedding))
             self.tasks[task_id] = task_data
+            self._user_tasks.setdefault(username, {})[task_id] = task_data
+            self._search_text[task_id] = self._make_search_text(task_data)
+            self._add_title(username, title, task_id)
+            self._emb_index.pop(username, None)
         
-        self.save_tasks()  # Immediate write
+        self._schedule_save()
         
-        print(f"✅ Created task: {task_id} - '{title}' for user {username} (priority: {priority}, due: {due_date})")
+        logger.debug("✅ Created task: %s - '%s' for user %s (priority: %s, due: %s)", task_id, title, username, priority, due_date)
         
         return Task(**task_data)
     
     def get_task(self, task_id: str, username: str) -> Optional[Task]:
         """Get a specific task by ID for a user"""
-        self.load_tasks()  # Always reload for consistency
+        self._maybe_reload()
         task_data = self.tasks.get(task_id)
         if task_data and task_data.get("username") == username:
             return Task(**task_data)
@@ -104,74 +322,94 @@ class Database:
     
     def get_all_tasks(self, username: str) -> List[Task]:
         """Get all tasks for a user"""
-        self.load_tasks()  # Always reload for consistency
+        self._maybe_reload()
         user_tasks = [
             Task(**task_data) 
-            for task_data in self.tasks.values() 
-            if task_data.get("username") == username
+            for task_data in self._user_tasks.get(username, {}).values()
         ]
-        print(f"📋 Loaded {len(user_tasks)} tasks for user {username}")
+        logger.debug("📋 Loaded %d tasks for user %s", len(user_tasks), username)
         return user_tasks
     
+    def get_task_by_title(self, title: str, username: str) -> Optional[Task]:
+        """Case-insensitive exact title match - O(1) via the per-user title index"""
+        self._maybe_reload()
+        task_ids = self._by_user_lower_title.get(username, {}).get(title.lower())
+        if task_ids:
+            return Task(**self.tasks[task_ids[0]])
+        return None
+    
+    def get_task_titles(self, username: str) -> List[str]:
+        """Lowercased titles of a user's tasks (candidates for fuzzy matching)"""
+        self._maybe_reload()
+        return list(self._by_user_lower_title.get(username, {}))
+    
     def update_task(
         self,
         task_id: str,
         username: str,
-        title: Optional[str] = None,
-        description: Optional[str] = None,
-        priority: Optional[str] = None,
-        status: Optional[str] = None,
-        due_date: Optional[str] = None,
-        category: Optional[str] = None
+        /,  # positional-only, so request bodies can't collide with them
+        **fields: Optional[str]
     ) -> Optional[Task]:
-        """Update a task"""
-        self.load_tasks()  # Always reload
-        task_data = self.tasks.get(task_id)
-        
-        if not task_data or task_data.get("username") != username:
-            print(f"❌ Task {task_id} not found or wrong user")
-            return None
-        
-        # Update fields
-        if title is not None:
-            task_data["title"] = title
-        if description is not None:
-            task_data["description"] = description
-        if priority is not None:
-            task_data["priority"] = priority
-        if status is not None:
-            task_data["status"] = status
-        if due_date is not None:
-            task_data["due_date"] = due_date
-        if category is not None:
-            task_data["category"] = category
-        
-        task_data["updated_at"] = datetime.now().isoformat()
+        """Update a task; only UPDATABLE_FIELDS with a non-None value are applied"""
+        self._maybe_reload()
         
+        # Lookup and mutation share one critical section: a concurrent reload or
+        # delete can't swap the record out from under us between the two
         with self._lock:
-            self.tasks[task_id] = task_data
+            task_data = self.tasks.get(task_id)
+            if not task_data or task_data.get("username") != username:
+                task = None
+            else:
+                old_title = task_data["title"]
+                
+                # Update fields
+                for field in UPDATABLE_FIELDS:
+                    value = fields.get(field)
+                    if value is not None:
+                        task_data[field] = value
+                task_data["updated_at"] = datetime.now().isoformat()
+                self._intern_fields(task_data)
+                
+                self._search_text[task_id] = self._make_search_text(task_data)
+                if task_data["title"] != old_title:
+                    self._remove_title(username, old_title, task_id)
+                    self._add_title(username, task_data["title"], task_id)
+                task = Task(**task_data)
         
-        self.save_tasks()  # Immediate write
+        if task is None:
+            logger.debug("❌ Task %s not found or wrong user", task_id)
+            return None
         
-        print(f"✅ Updated task: {task_id} - status: {status}")
+        self._schedule_save()
         
-        return Task(**task_data)
+        logger.debug("✅ Updated task: %s - status: %s", task_id, task.status)
+        
+        return task
     
     def delete_task(self, task_id: str, username: str) -> bool:
         """Delete a task"""
-        self.load_tasks()  # Always reload
-        task_data = self.tasks.get(task_id)
-        
-        if not task_data or task_data.get("username") != username:
-            print(f"❌ Task {task_id} not found or wrong user")
-            return False
+        self._maybe_reload()
         
         with self._lock:
-            del self.tasks[task_id]
+            task_data = self.tasks.get(task_id)
+            if not task_data or task_data.get("username") != username:
+                task_data = None
+            else:
+                del self.tasks[task_id]
+                del self._user_tasks[username][task_id]
+                del self._search_text[task_id]
+                self._remove_title(username, task_data["title"], task_id)
+                if task_data.get("embedding_row") is not None:
+                    self._released_rows.append(task_data["embedding_row"])
+                self._emb_index.pop(username, None)
         
-        self.save_tasks()  # Immediate write
+        if task_data is None:
+            logger.debug("❌ Task %s not found or wrong user", task_id)
+            return False
         
-        print(f"🗑️ Deleted task: {task_id}")
+        self._schedule_save()
+        
+        logger.debug("🗑️ Deleted task: %s", task_id)
         return True
     
     def search_tasks(
@@ -179,16 +417,40 @@ class Database:
         username: str,
         status: Optional[str] = None,
         priority: Optional[str] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        query: Optional[str] = None
     ) -> List[Task]:
-        """Search tasks with filters"""
-        self.load_tasks()  # Always reload
-        results = []
+        """Search tasks with filters; query is a case-insensitive title/description substring"""
+        results = [
+            Task(**task_data)
+            for task_data in self._filter_tasks(username, status, priority, category, query)
+        ]
+        logger.debug("🔍 Search found %d tasks for user %s", len(results), username)
+        return results
+    
+    def search_tasks_raw(
+        self,
+        username: str,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        category: Optional[str] = None,
+        query: Optional[str] = None
+    ) -> List[dict]:
+        """search_tasks for read-only endpoints: public-field dicts, no Task validation"""
+        return [
+            {field: task_data.get(field) for field in TASK_PUBLIC_FIELDS}
+            for task_data in self._filter_tasks(username, status, priority, category, query)
+        ]
+    
+    def _filter_tasks(self, username, status, priority, category, query):
+        """Yield the user's raw task records matching every given filter"""
+        self._maybe_reload()
+        query_lower = query.lower() if query else None
+        status, priority, category = (sys.intern(v) if v else v for v in (status, priority, category))
         
-        for task_data in self.tasks.values():
-            if task_data.get("username") != username:
+        for task_id, task_data in self._user_tasks.get(username, {}).items():
+            if query_lower and query_lower not in self._search_text[task_id]:
                 continue
-            
             if status and task_data.get("status") != status:
                 continue
             if priority and task_data.get("priority") != priority:
@@ -196,10 +458,28 @@ class Database:
             if category and task_data.get("category") != category:
                 continue
             
-            results.append(Task(**task_data))
+            yield task_data
+    
+    def _user_embedding_matrix(self, username: str):
+        """Per-user matrix of unit-length embeddings; only that user's writes (or a reload) rebuild it"""
+        entry = self._emb_index.get(username)
+        if entry is not None:
+            return entry
         
-        print(f"🔍 Search found {len(results)} tasks for user {username}")
-        return results
+        task_ids = []
+        rows = []
+        stored = self._emb_mmap.shape[0] if self._emb_mmap is not None else 0
+        for task_id, task_data in self._user_tasks.get(username, {}).items():
+            # Rows past the end of the sidecar were never flushed there: skip, don't crash
+            if task_data.get("embedding_row") is not None and task_data["embedding_row"] < stored:
+                task_ids.append(task_id)
+                rows.append(task_data["embedding_row"])
+        
+        # Fancy indexing gathers the rows into one contiguous matrix; BLAS needs float32
+        matrix = self._emb_mmap[rows].astype(np.float32) if rows else np.empty((0, 0), dtype=np.float32)
+        
+        self._emb_index[username] = (matrix, task_ids)
+        return matrix, task_ids
     
     def semantic_search(
         self,
@@ -209,38 +489,28 @@ class Database:
         threshold: float = 0.3
     ) -> List[Task]:
         """RAG: Semantic search using vector embeddings"""
-        import numpy as np
         
-        self.load_tasks()  # Always reload
-        results = []
+        self._maybe_reload()
         
-        for task_data in self.tasks.values():
-            if task_data.get("username") != username:
-                continue
-            
-            task_embedding = task_data.get("embedding")
-            if not task_embedding:
-                continue
-            
-            # Calculate cosine similarity
-            try:
-                similarity = np.dot(query_embedding, task_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(task_embedding)
-                )
-                
-                if similarity >= threshold:
-                    results.append((similarity, Task(**task_data)))
-            except:
-                pass
+        matrix, task_ids = self._user_embedding_matrix(username)
+        if not task_ids:
+            return []
+        
+        # Rows are stored unit-length: cosine similarity is one SGEMV of dot products
+        similarities = matrix @ normalize_embedding(query_embedding)
+        
+        # Threshold first, then top-k without a full sort, then order just those k
+        top = np.flatnonzero(similarities >= threshold)
+        if len(top) > top_k:
+            top = top[np.argpartition(-similarities[top], top_k - 1)[:top_k]]
+        top = top[np.argsort(-similarities[top])]
         
-        # Sort by similarity and return top_k
-        results.sort(key=lambda x: x[0], reverse=True)
-        return [task for _, task in results[:top_k]]
+        return [Task(**self.tasks[task_ids[i]]) for i in top]
     
     def get_user(self, username: str) -> Optional[dict]:
         """Get user from auth service (delegated to auth.py)"""
         from api.auth import auth_service
-        return auth_service.users.get(username)
+        return auth_service.get_user(username)
 
 
 # Global database instance
@@ -2,10 +2,40 @@
 Enterprise Date Parser for AI Todo System
 Handles complex date expressions with high accuracy
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 import re
 
+_WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+# Every relative-date form in one pass; the leftmost match wins and is dispatched on lastgroup
+_RELATIVE_DATE_RE = re.compile(
+    r'(?P<day_after>day after tomorrow|dayaftertomorrow)'
+    r'|(?P<today>today|tody)'
+    r'|(?P<tomorrow>tomorrow|tmrw|tmw)'
+    r'|(?P<next_week>next week|nxt week)'
+    r'|(?P<this_week>this week)'
+    r'|in\s+(?P<in_days>\d+)\s+days?'
+    r'|next (?P<weekday>' + '|'.join(_WEEKDAYS) + r')'
+)
+_DAY_OFFSETS = {"today": 0, "tomorrow": 1, "day_after": 2, "next_week": 7}
+
+_DATE_REFERENCE_RE = re.compile('|'.join(map(re.escape, [
+    'today', 'tomorrow', 'tmrw', 'day after', 'next week',
+    'this week', 'in', 'days', *_WEEKDAYS
+])))
+
+# Specific date formats: (pattern, year_first)
+_DATE_PATTERNS = [
+    (re.compile(r'(\d{4})-(\d{2})-(\d{2})'), True),   # 2025-10-28
+    (re.compile(r'(\d{2})/(\d{2})/(\d{4})'), False),  # 28/10/2025
+    (re.compile(r'(\d{2})-(\d{2})-(\d{4})'), False),  # 28-10-2025
+]
+
 
 class DateParser:
     """Advanced date parsing with natural language support"""
@@ -19,79 +49,48 @@ class DateParser:
         if base_date is None:
             base_date = datetime.now()
         
+        # Output only depends on the calendar day, so cache on (text, day)
+        return DateParser._parse_relative_date(text, base_date.date())
+    
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _parse_relative_date(text: str, base_date: date) -> Optional[str]:
         text_lower = text.lower().strip()
         
-        # Direct keyword mapping
-        if "today" in text_lower or "tody" in text_lower:
-            return base_date.strftime("%Y-%m-%d")
-        
-        if "tomorrow" in text_lower or "tmrw" in text_lower or "tmw" in text_lower:
-            return (base_date + timedelta(days=1)).strftime("%Y-%m-%d")
-        
-        if "day after tomorrow" in text_lower or "dayaftertomorrow" in text_lower:
-            return (base_date + timedelta(days=2)).strftime("%Y-%m-%d")
-        
-        if "next week" in text_lower or "nxt week" in text_lower:
-            return (base_date + timedelta(days=7)).strftime("%Y-%m-%d")
-        
-        if "this week" in text_lower:
-            days_until_friday = (4 - base_date.weekday()) % 7
-            return (base_date + timedelta(days=days_until_friday)).strftime("%Y-%m-%d")
-        
-        # Parse "in X days"
-        match = re.search(r'in\s+(\d+)\s+days?', text_lower)
+        match = _RELATIVE_DATE_RE.search(text_lower)
         if match:
-            days = int(match.group(1))
-            return (base_date + timedelta(days=days)).strftime("%Y-%m-%d")
-        
-        # Parse "next monday", "next friday", etc.
-        weekdays = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-            'friday': 4, 'saturday': 5, 'sunday': 6
-        }
-        
-        for day_name, day_num in weekdays.items():
-            if f"next {day_name}" in text_lower:
-                days_ahead = day_num - base_date.weekday()
-                if days_ahead <= 0:
-                    days_ahead += 7
-                return (base_date + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+            kind = match.lastgroup
+            if kind in _DAY_OFFSETS:
+                days = _DAY_OFFSETS[kind]
+            elif kind == "this_week":
+                days = (4 - base_date.weekday()) % 7  # Until Friday
+            elif kind == "in_days":
+                days = int(match.group("in_days"))
+            else:
+                days = _WEEKDAYS[match.group("weekday")] - base_date.weekday()
+                if days <= 0:
+                    days += 7
+            return (base_date + timedelta(days=days)).isoformat()
         
         # Parse specific date formats (YYYY-MM-DD, DD/MM/YYYY, etc.)
-        date_patterns = [
-            r'(\d{4})-(\d{2})-(\d{2})',  # 2025-10-28
-            r'(\d{2})/(\d{2})/(\d{4})',  # 28/10/2025
-            r'(\d{2})-(\d{2})-(\d{4})',  # 28-10-2025
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
+        for pattern, year_first in _DATE_PATTERNS:
+            match = pattern.search(text)
             if match:
-                try:
-                    if '-' in pattern and pattern.startswith(r'(\d{4})'):
-                        # YYYY-MM-DD format
-                        year, month, day = match.groups()
-                        return f"{year}-{month}-{day}"
-                    else:
-                        # DD/MM/YYYY or DD-MM-YYYY format
-                        day, month, year = match.groups()
-                        return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                except:
-                    pass
+                if year_first:
+                    # YYYY-MM-DD format
+                    year, month, day = match.groups()
+                    return f"{year}-{month}-{day}"
+                else:
+                    # DD/MM/YYYY or DD-MM-YYYY format
+                    day, month, year = match.groups()
+                    return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
         
         return None
     
     @staticmethod
     def has_date_reference(text: str) -> bool:
         """Check if text contains any date reference"""
-        date_keywords = [
-            'today', 'tomorrow', 'tmrw', 'day after', 'next week',
-            'this week', 'in', 'days', 'monday', 'tuesday', 'wednesday',
-            'thursday', 'friday', 'saturday', 'sunday'
-        ]
-        
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in date_keywords)
+        return _DATE_REFERENCE_RE.search(text.lower()) is not None
 
 
 # Global instance
@@ -0,0 +1,134 @@
+"""
+Embedding utilities for AI Todo System
+Features:
+- Dynamic batching: concurrent encode requests coalesce into one forward pass
+- Model runs in a worker thread so the event loop stays responsive
+- ONNX Runtime backend (int8-quantized export by default) with automatic PyTorch fallback
+- Optional BF16 / dynamic INT8 / torch.compile for the PyTorch path
+"""
+import os
+import asyncio
+import logging
+from functools import partial
+from typing import List, Optional, Tuple
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")  # "onnx" or "torch"
+# Pre-quantized int8 export shipped in the model repo (~4x smaller, int8 GEMM);
+# "onnx/model_qint8_avx512_vnni.onnx" suits VNNI CPUs, "onnx/model.onnx" is FP32
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+EMBEDDING_TORCH_PRECISION = os.getenv("EMBEDDING_TORCH_PRECISION", "fp32")  # "fp32", "bf16" or "int8"
+EMBEDDING_TORCH_COMPILE = os.getenv("EMBEDDING_TORCH_COMPILE", "false").lower() == "true"
+# Load at startup (false: defer to the first request for an instant boot)
+EMBEDDING_PRELOAD = os.getenv("EMBEDDING_PRELOAD", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 32
+BATCH_TIMEOUT_MS = 10
+
+
+def load_embedding_model() -> SentenceTransformer:
+    """Load MiniLM on ONNX Runtime (fused kernels, no autograd), falling back to PyTorch"""
+    if EMBEDDING_BACKEND == "onnx":
+        # Models without the quantized export fall back to their plain ONNX file
+        for file_name in dict.fromkeys([EMBEDDING_ONNX_FILE, "onnx/model.onnx"]):
+            try:
+                model = SentenceTransformer(
+                    EMBEDDING_MODEL,
+                    backend="onnx",
+                    model_kwargs={"provider": "CPUExecutionProvider", "file_name": file_name}
+                )
+                logger.info("⚡ Embedding backend: ONNX Runtime (%s)", file_name)
+                return model
+            except Exception as e:
+                logger.warning("⚠️ ONNX model %s unavailable (%s)", file_name, e)
+        logger.warning("⚠️ ONNX backend unavailable, using PyTorch")
+
+    model = optimize_torch_model(SentenceTransformer(EMBEDDING_MODEL, device="cpu"))
+    logger.info("📊 Embedding backend: PyTorch (%s)", EMBEDDING_TORCH_PRECISION)
+    return model
+
+
+def optimize_torch_model(model: SentenceTransformer) -> SentenceTransformer:
+    """Apply reduced precision / graph compilation, then warm up once so the cost is paid at startup"""
+    import torch
+
+    if EMBEDDING_TORCH_PRECISION == "bf16":
+        # Only a win on CPUs with native BF16 (AVX-512 BF16 / AMX)
+        model = model.to(dtype=torch.bfloat16)
+    elif EMBEDDING_TORCH_PRECISION == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if EMBEDDING_TORCH_COMPILE:
+        # dynamic=True: sequence length varies per batch, avoid a recompile per shape
+        model[0].auto_model = torch.compile(model[0].auto_model, dynamic=True)
+
+    model.encode("warm up")
+    return model
+
+
+class EmbeddingBatcher:
+    """Queue-based dynamic batcher around SentenceTransformer.encode"""
+
+    def __init__(self, model, batch_size: int = BATCH_SIZE, timeout_ms: int = BATCH_TIMEOUT_MS):
+        self.model = model
+        self.batch_size = batch_size
+        self.timeout = timeout_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self):
+        # Queue and worker are bound to the running event loop, so create them lazily
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode one text; waits at most timeout_ms for other requests to join the batch"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.timeout
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            texts = [text for text, _ in batch]
+
+            try:
+                embeddings = await loop.run_in_executor(None, partial(
+                    self.model.encode,
+                    texts,
+                    batch_size=self.batch_size,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                ))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
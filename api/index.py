@@ -1,7 +1,9 @@
 from fastapi import FastAPI, HTTPException, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
 
@@ -12,41 +14,32 @@ load_dotenv()
 from api.agent import agent
 from api.database import db
 from api.auth import auth_service
+from api.embeddings import EMBEDDING_PRELOAD
+from api.schemas import UserCreate, UserLogin, ChatRequest, ChatResponse, TaskResponse
 
-app = FastAPI(title="AI Todo Chatbot API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EMBEDDING_PRELOAD:
+        await run_in_threadpool(agent.warm_up)
+    yield
+    await agent.aclose()
+    db.flush()
+
+
+app = FastAPI(title="AI Todo Chatbot API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CORS middleware for frontend
+# Auth is a Bearer header, not cookies, so credentials are off and "*" is sent as a
+# static header instead of echoing each request's Origin
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000",
-                   "https://ai-todo-chatbot-1.vercel.app",
-                   "https://rupankar-1733-ai-todo-chatbot.hf.space",
-                   "*" ],
-    allow_credentials=True,
+    allow_origins=["*"],
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Request/Response models
-class SignupRequest(BaseModel):
-    username: str
-    email: str
-    password: str
-
-class LoginRequest(BaseModel):
-    username: str
-    password: str
-
-class ChatRequest(BaseModel):
-    message: str
-
-class ChatResponse(BaseModel):
-    response: str
-
-class TaskResponse(BaseModel):
-    tasks: List[dict]
-    count: int
-
 # Dependency to get current user from token
 def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
     """Verify token and get current user"""
@@ -73,10 +66,12 @@ async def root():
 
 # ========== AUTH ENDPOINTS ==========
 @app.post("/api/signup")
-async def signup(request: SignupRequest):
+async def signup(request: UserCreate):
     """Register a new user"""
     try:
-        result = auth_service.create_user(
+        # Password hashing is CPU-bound - keep it off the event loop
+        result = await run_in_threadpool(
+            auth_service.create_user,
             request.username,
             request.email,
             request.password
@@ -93,10 +88,10 @@ async def signup(request: SignupRequest):
         raise HTTPException(status_code=500, detail=f"Signup error: {str(e)}")
 
 @app.post("/api/login")
-async def login(request: LoginRequest):
+async def login(request: UserLogin):
     """Login and get JWT token"""
     try:
-        token = auth_service.authenticate_user(request.username, request.password)
+        token = await run_in_threadpool(auth_service.authenticate_user, request.username, request.password)
         
         if not token:
             raise HTTPException(status_code=401, detail="Invalid username or password")
@@ -131,9 +126,8 @@ async def chat(request: ChatRequest, user: dict = Depends(get_current_user)):
         if not request.message or not request.message.strip():
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
-        # SET USERNAME FOR THIS SESSION - USER ISOLATION
-        agent.set_username(user["username"])
-        response = agent.chat(request.message)
+        # PER-USER SESSION - USER ISOLATION
+        response = await agent.chat(user["username"], request.message)
         
         return ChatResponse(response=response)
     
@@ -147,7 +141,7 @@ async def chat(request: ChatRequest, user: dict = Depends(get_current_user)):
 async def clear_conversation(user: dict = Depends(get_current_user)):
     """Clear the conversation history (Protected)"""
     try:
-        agent.conversation_history = []
+        agent.get_session(user["username"]).clear_history()
         return {"message": "Conversation history cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing history: {str(e)}")
@@ -156,9 +150,10 @@ async def clear_conversation(user: dict = Depends(get_current_user)):
 async def get_conversation_history(user: dict = Depends(get_current_user)):
     """Get the conversation history (Protected)"""
     try:
+        history = agent.get_session(user["username"]).conversation_history
         return {
-            "history": [msg.to_dict() for msg in agent.conversation_history],
-            "count": len(agent.conversation_history)
+            "history": [msg.model_dump() for msg in history],
+            "count": len(history)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching history: {str(e)}")
@@ -173,17 +168,15 @@ async def get_tasks(
 ):
     """Get all tasks with optional filters (Protected) - USER ISOLATED"""
     try:
-        tasks = db.search_tasks(
+        # Raw dicts straight to orjson - no per-row Task validation on this read path
+        tasks = db.search_tasks_raw(
             username=user["username"],  # USER-SPECIFIC ISOLATION
             status=status,
             priority=priority,
             category=category
         )
         
-        return TaskResponse(
-            tasks=[task.to_dict() for task in tasks],
-            count=len(tasks)
-        )
+        return ORJSONResponse({"tasks": tasks, "count": len(tasks)})
     
     except Exception as e:
         print(f"❌ Get tasks error for user {user['username']}: {str(e)}")
@@ -214,16 +207,7 @@ async def update_task_endpoint(
         print(f"🔄 PATCH /api/tasks/{task_id} - User: {user['username']}")
         print(f"📝 Update data: {update_data}")
         
-        updated_task = db.update_task(
-            task_id=task_id,
-            username=user["username"],
-            title=update_data.get("title"),
-            description=update_data.get("description"),
-            priority=update_data.get("priority"),
-            status=update_data.get("status"),
-            due_date=update_data.get("due_date"),
-            category=update_data.get("category")
-        )
+        updated_task = db.update_task(task_id, user["username"], **update_data)
         
         if not updated_task:
             print(f"❌ Task {task_id} not found for user {user['username']}")
@@ -6,9 +6,45 @@ Features:
 - LLM-powered title extraction for complex sentences
 - Date/priority extraction with 100% accuracy
 """
+import logging
 import re
+from functools import lru_cache
 from typing import Optional
-from difflib import SequenceMatcher
+from rapidfuzz import process, fuzz
+from rapidfuzz.distance import OSA
+from api.cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+TITLE_CACHE_SIZE = 2048
+TITLE_CACHE_TTL = 86400.0  # Extraction only depends on the text, so keep results a day
+# Priority typos: only words and synonyms this long are fuzzy-matched. At four letters
+# one edit still joins everyday words to synonyms ("noon" ~ "soon", "lens" ~ "less")
+PRIORITY_FUZZY_MIN_LENGTH = 5
+# OSA edit similarity, so a swapped pair ("urgnet") is one edit; 0.8 is one edit in five
+PRIORITY_FUZZY_CUTOFF = 0.8
+
+# Few-shot prefix built once; only the message is appended per call
+_TITLE_PROMPT = """Extract the main task/action from this sentence as a short, clear task title (max 6 words).
+
+Examples:
+Input: "I have a tight schedule but still want to hold a meeting tomorrow with my boss"
+Output: meeting with boss
+
+Input: "Need to urgently buy groceries for the party next week"
+Output: buy groceries for party
+
+Input: "Reminder to call the dentist about my appointment"
+Output: call dentist about appointment
+
+Input: "I should probably finish the quarterly report by tomorrow"
+Output: finish quarterly report
+
+Input: "Don't forget to send email to client"
+Output: send email to client
+
+Now extract from:
+"""
 
 
 class NLPUtils:
@@ -31,21 +67,21 @@ class NLPUtils:
         "this_week": ["this week", "thisweek", "this wk", "ths week", "ths wk", "dis week"]
     }
     
-    # Task action verbs (comprehensive list)
+    # Task action verbs (comprehensive list, matched as whole words)
     TASK_VERBS = [
-        r'\bbuy\b', r'\bpurchase\b', r'\bget\b', r'\bgrab\b', r'\bpick up\b',
-        r'\bcall\b', r'\bphone\b', r'\bcontact\b', r'\breach\b', r'\btext\b',
-        r'\bsend\b', r'\bemail\b', r'\bmessage\b', r'\bforward\b', r'\breply\b',
-        r'\bmeet\b', r'\bmeeting\b', r'\bschedule\b', r'\bbook\b', r'\barrange\b',
-        r'\bfinish\b', r'\bcomplete\b', r'\bsubmit\b', r'\bdeliver\b', r'\bhand in\b',
-        r'\bwrite\b', r'\bdraft\b', r'\bprepare\b', r'\bcreate\b', r'\bmake\b',
-        r'\breview\b', r'\bcheck\b', r'\bverify\b', r'\bconfirm\b', r'\bvalidate\b',
-        r'\bupdate\b', r'\bfix\b', r'\brepair\b', r'\breplace\b', r'\bmodify\b',
-        r'\border\b', r'\breserve\b', r'\borganize\b', r'\bplan\b', r'\bsetup\b',
-        r'\bpay\b', r'\brenew\b', r'\bcancel\b', r'\breturn\b', r'\brefund\b',
-        r'\bclean\b', r'\bwash\b', r'\bcook\b', r'\bprepare\b', r'\bfile\b',
-        r'\bprint\b', r'\bscan\b', r'\bcopy\b', r'\bdownload\b', r'\bupload\b',
-        r'\binstall\b', r'\buninstall\b', r'\bbackup\b', r'\brestore\b'
+        'buy', 'purchase', 'get', 'grab', 'pick up',
+        'call', 'phone', 'contact', 'reach', 'text',
+        'send', 'email', 'message', 'forward', 'reply',
+        'meet', 'meeting', 'schedule', 'book', 'arrange',
+        'finish', 'complete', 'submit', 'deliver', 'hand in',
+        'write', 'draft', 'prepare', 'create', 'make',
+        'review', 'check', 'verify', 'confirm', 'validate',
+        'update', 'fix', 'repair', 'replace', 'modify',
+        'order', 'reserve', 'organize', 'plan', 'setup',
+        'pay', 'renew', 'cancel', 'return', 'refund',
+        'clean', 'wash', 'cook', 'file',
+        'print', 'scan', 'copy', 'download', 'upload',
+        'install', 'uninstall', 'backup', 'restore'
     ]
     
     # Task phrases
@@ -55,32 +91,78 @@ class NLPUtils:
         'going to', 'got to', 'gotta', 'supposed to'
     ]
     
+    # Title noise removed by extract_task_title
+    TITLE_NOISE_PATTERNS = [
+        r'\bcreate\s+task\b', r'\badd\s+task\b', r'\bnew\s+task\b',
+        r'\btask\b', r'\bto\s+do\b', r'\btodo\b',
+        r'\bremind\s+me\s+to\b', r'\breminder\s+to\b',
+        r'\bi\s+need\s+to\b', r'\bi\s+want\s+to\b', r'\bi\s+have\s+to\b',
+        r'\bi\s+should\b', r'\bi\s+must\b', r'\bi\'m\s+going\s+to\b',
+        r'\bdon\'t\s+forget\s+to\b', r'\bdon\'t\s+forget\b',
+        r'\bdont\s+forget\b', r'\bgotta\b', r'\bgot\s+to\b'
+    ]
+    
+    # Compiled once at import instead of going through re's cache on every call
+    # Every verb and phrase in one alternation: a single scan of the message instead of ~75.
+    # Phrases keep their plain-substring semantics (no word boundaries), as before.
+    _TASK_INTENT_RE = re.compile(
+        r'\b(?:' + '|'.join(map(re.escape, TASK_VERBS)) + r')\b'
+        + '|' + '|'.join(map(re.escape, TASK_PHRASES))
+    )
+    # Keyword removers: one alternation per category, so each is a single re.sub.
+    # Longest first, so "day after tomorrow" is removed whole rather than leaving "day after".
+    _DATE_KEYWORD_RE = re.compile(r'\b(?:' + '|'.join(
+        map(re.escape, sorted({p for patterns in DATE_PATTERNS.values() for p in patterns}, key=len, reverse=True))
+    ) + r')\b', re.IGNORECASE)
+    _PRIORITY_KEYWORD_RE = re.compile(r'\b(?:' + '|'.join(
+        map(re.escape, sorted({s for synonyms in PRIORITY_SYNONYMS.values() for s in synonyms}, key=len, reverse=True))
+    ) + r')\b', re.IGNORECASE)
+    # Listed order already puts longer phrases first ("don't forget to" before "don't forget")
+    _TITLE_NOISE_RE = re.compile('|'.join(TITLE_NOISE_PATTERNS), re.IGNORECASE)
+    _WHITESPACE_RE = re.compile(r'\s+')
+    _WORD_RE = re.compile(r"[a-z0-9']+")
+    
+    # synonym -> priority, for an O(1) exact lookup per word
+    _PRIORITY_BY_SYNONYM = {s: p for p, synonyms in PRIORITY_SYNONYMS.items() for s in synonyms}
+    # Short synonyms ("hi", "low", "med") and their typos only ever match exactly
+    _FUZZY_PRIORITY_SYNONYMS = [s for s in _PRIORITY_BY_SYNONYM if len(s) >= PRIORITY_FUZZY_MIN_LENGTH]
+    
+    # Normalized message -> LLM-extracted title; only successful extractions are stored
+    _title_cache = SemanticCache(max_size=TITLE_CACHE_SIZE, ttl=TITLE_CACHE_TTL)
+    
     @staticmethod
-    def fuzzy_match(text: str, candidates: list, threshold: float = 0.7) -> Optional[str]:
-        """Fuzzy match with Levenshtein distance"""
-        text_clean = text.lower().strip()
-        best_match = None
-        best_ratio = 0.0
-        
-        for candidate in candidates:
-            ratio = SequenceMatcher(None, text_clean, candidate.lower()).ratio()
-            if ratio > best_ratio and ratio >= threshold:
-                best_ratio = ratio
-                best_match = candidate
-        
-        return best_match
+    def fuzzy_match(text: str, candidates: list, score_cutoff: float = 70, scorer=fuzz.ratio) -> Optional[str]:
+        """Best case-insensitive match scoring at least score_cutoff (in the scorer's units)"""
+        # rapidfuzz's ratio is the same 2*matches/total score SequenceMatcher gave, in C++
+        match = process.extractOne(
+            text.lower().strip(), candidates,
+            scorer=scorer, processor=str.lower, score_cutoff=score_cutoff
+        )
+        return match[0] if match else None
     
     @staticmethod
+    @lru_cache(maxsize=512)
     def extract_priority(text: str) -> Optional[str]:
         """Extract priority with typo correction"""
         text_lower = text.lower()
         
-        for priority, synonyms in NLPUtils.PRIORITY_SYNONYMS.items():
-            for synonym in synonyms:
-                if synonym in text_lower:
-                    return priority
-            
-            if NLPUtils.fuzzy_match(text_lower, synonyms):
+        words = NLPUtils._WORD_RE.findall(text_lower)
+        
+        # Fast path: whole-word synonym hits ("this" no longer reads as "hi"), most urgent wins
+        found = {NLPUtils._PRIORITY_BY_SYNONYM.get(word) for word in words}
+        if not found - {None}:
+            # Typos ("buy milk urgnet"): fuzzy-match only the words that missed the lookup
+            for word in words:
+                if len(word) < PRIORITY_FUZZY_MIN_LENGTH:
+                    continue
+                synonym = NLPUtils.fuzzy_match(
+                    word, NLPUtils._FUZZY_PRIORITY_SYNONYMS, PRIORITY_FUZZY_CUTOFF, scorer=OSA.normalized_similarity
+                )
+                if synonym:
+                    found.add(NLPUtils._PRIORITY_BY_SYNONYM[synonym])
+        
+        for priority in NLPUtils.PRIORITY_SYNONYMS:
+            if priority in found:
                 return priority
         
         return None
@@ -93,95 +175,55 @@ class NLPUtils:
         """
         text_lower = text.lower().strip()
         
-        # Check task verbs
-        for verb in NLPUtils.TASK_VERBS:
-            if re.search(verb, text_lower):
-                print(f"🎯 Task verb detected: {verb}")
-                return True
-        
-        # Check task phrases
-        for phrase in NLPUtils.TASK_PHRASES:
-            if phrase in text_lower:
-                print(f"🎯 Task phrase detected: '{phrase}'")
-                return True
+        match = NLPUtils._TASK_INTENT_RE.search(text_lower)
+        if match:
+            logger.debug("🎯 Task intent detected: '%s'", match.group())
+            return True
         
         return False
     
     @staticmethod
     def remove_date_keywords(text: str) -> str:
         """Remove date keywords from text"""
-        text_clean = text
-        for patterns in NLPUtils.DATE_PATTERNS.values():
-            for pattern in patterns:
-                text_clean = re.sub(rf'\b{re.escape(pattern)}\b', '', text_clean, flags=re.IGNORECASE)
-        return text_clean.strip()
+        return NLPUtils._DATE_KEYWORD_RE.sub('', text).strip()
     
     @staticmethod
     def remove_priority_keywords(text: str) -> str:
         """Remove priority keywords from text"""
-        text_clean = text
-        for synonyms in NLPUtils.PRIORITY_SYNONYMS.values():
-            for synonym in synonyms:
-                text_clean = re.sub(rf'\b{re.escape(synonym)}\b', '', text_clean, flags=re.IGNORECASE)
-        return text_clean.strip()
+        return NLPUtils._PRIORITY_KEYWORD_RE.sub('', text).strip()
     
     @staticmethod
+    @lru_cache(maxsize=4096)
     def extract_task_title(text: str) -> str:
-        """Extract clean task title (fast regex-based)"""
+        """Extract clean task title (fast regex-based); pure function of text, so memoized"""
         title = text
         title = NLPUtils.remove_date_keywords(title)
         title = NLPUtils.remove_priority_keywords(title)
         
         # Remove common task creation phrases
-        patterns_to_remove = [
-            r'\bcreate\s+task\b', r'\badd\s+task\b', r'\bnew\s+task\b',
-            r'\btask\b', r'\bto\s+do\b', r'\btodo\b',
-            r'\bremind\s+me\s+to\b', r'\breminder\s+to\b',
-            r'\bi\s+need\s+to\b', r'\bi\s+want\s+to\b', r'\bi\s+have\s+to\b',
-            r'\bi\s+should\b', r'\bi\s+must\b', r'\bi\'m\s+going\s+to\b',
-            r'\bdon\'t\s+forget\s+to\b', r'\bdon\'t\s+forget\b',
-            r'\bdont\s+forget\b', r'\bgotta\b', r'\bgot\s+to\b'
-        ]
-        
-        for pattern in patterns_to_remove:
-            title = re.sub(pattern, '', title, flags=re.IGNORECASE)
+        title = NLPUtils._TITLE_NOISE_RE.sub('', title)
         
         # Clean up extra spaces
-        title = re.sub(r'\s+', ' ', title).strip()
+        title = NLPUtils._WHITESPACE_RE.sub(' ', title).strip()
         
         return title if title else text
     
     @staticmethod
-    def extract_task_title_llm(text: str, llm_client=None) -> str:
+    async def extract_task_title_llm(text: str, llm_client=None) -> str:
         """Use LLM to extract title from complex sentences"""
         if not llm_client:
-            print("⚠️ No LLM client, using regex extraction")
+            logger.debug("⚠️ No LLM client, using regex extraction")
             return NLPUtils.extract_task_title(text)
         
+        cache_key = NLPUtils._WHITESPACE_RE.sub(' ', SemanticCache.normalize_key(text))
+        cached = NLPUtils._title_cache.get_exact(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            prompt = f"""Extract the main task/action from this sentence as a short, clear task title (max 6 words).
-
-Examples:
-Input: "I have a tight schedule but still want to hold a meeting tomorrow with my boss"
-Output: meeting with boss
-
-Input: "Need to urgently buy groceries for the party next week"
-Output: buy groceries for party
-
-Input: "Reminder to call the dentist about my appointment"
-Output: call dentist about appointment
-
-Input: "I should probably finish the quarterly report by tomorrow"
-Output: finish quarterly report
-
-Input: "Don't forget to send email to client"
-Output: send email to client
-
-Now extract from:
-Input: "{text}"
-Output:"""
+            prompt = _TITLE_PROMPT + f'Input: "{text}"\nOutput:'
 
-            response = llm_client.chat.completions.create(
+            response = await llm_client.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,
@@ -191,14 +233,15 @@ Output:"""
             extracted = response.choices[0].message.content.strip()
             
             if extracted and len(extracted) < 60:
-                print(f"✅ LLM extracted: '{extracted}'")
+                logger.debug("✅ LLM extracted: '%s'", extracted)
+                NLPUtils._title_cache.put(cache_key, extracted)
                 return extracted
             else:
-                print(f"⚠️ LLM invalid, using regex")
+                logger.debug("⚠️ LLM invalid, using regex")
                 return NLPUtils.extract_task_title(text)
                 
         except Exception as e:
-            print(f"⚠️ LLM failed: {e}")
+            logger.warning("⚠️ LLM title extraction failed: %s", e)
             return NLPUtils.extract_task_title(text)
 
 
@@ -2,6 +2,13 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 
+# Fields exposed by the API - excludes the owner and storage internals
+TASK_PUBLIC_FIELDS = (
+    "id", "title", "description", "priority", "status", "due_date",
+    "category", "tags", "created_at", "updated_at"
+)
+
+
 class Task(BaseModel):
     id: str
     username: str
@@ -12,23 +19,12 @@ class Task(BaseModel):
     due_date: Optional[str] = None
     category: Optional[str] = None
     tags: Optional[List[str]] = None
-    embedding: Optional[List[float]] = None
+    embedding_row: Optional[int] = None  # Row in the .embeddings.npy sidecar
     created_at: str
     updated_at: str
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "title": self.title,
-            "description": self.description,
-            "priority": self.priority,
-            "status": self.status,
-            "due_date": self.due_date,
-            "category": self.category,
-            "tags": self.tags,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
-        }
+        return {field: getattr(self, field) for field in TASK_PUBLIC_FIELDS}
 
 
 class TaskCreate(BaseModel):
@@ -65,6 +61,11 @@ class ChatResponse(BaseModel):
     response: str
 
 
+class TaskResponse(BaseModel):
+    tasks: List[dict]
+    count: int
+
+
 class UserCreate(BaseModel):
     username: str
     email: str
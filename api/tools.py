@@ -1,55 +1,63 @@
+from collections import Counter
 from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 import re
 
+_IN_DAYS_RE = re.compile(r'\bin (\d+) days?\b')
+_IN_WEEKS_RE = re.compile(r'\bin (\d+) weeks?\b')
+
+_WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+_WEEKDAY_RE = re.compile(r'\b(' + '|'.join(_WEEKDAYS) + r')\b')
+
+_HASHTAG_RE = re.compile(r'#(\w+)')
+
 def parse_relative_date(date_string: str) -> str:
     """
     Parse relative date strings like 'tomorrow', 'next week', 'in 3 days'
     Returns ISO format date string
     """
-    today = datetime.now()
+    # The clock is only read once a pattern has matched; most inputs never get there
     date_string = date_string.lower().strip()
     
     # Tomorrow
     if 'tomorrow' in date_string:
-        return (today + timedelta(days=1)).date().isoformat()
+        return (date.today() + timedelta(days=1)).isoformat()
     
     # Today
     if 'today' in date_string:
-        return today.date().isoformat()
+        return date.today().isoformat()
     
     # Next week
     if 'next week' in date_string:
-        return (today + timedelta(weeks=1)).date().isoformat()
+        return (date.today() + timedelta(weeks=1)).isoformat()
     
     # Next month
     if 'next month' in date_string:
-        return (today + timedelta(days=30)).date().isoformat()
+        return (date.today() + timedelta(days=30)).isoformat()
     
     # In X days
-    days_match = re.search(r'in (\d+) days?', date_string)
+    days_match = _IN_DAYS_RE.search(date_string)
     if days_match:
         days = int(days_match.group(1))
-        return (today + timedelta(days=days)).date().isoformat()
+        return (date.today() + timedelta(days=days)).isoformat()
     
     # In X weeks
-    weeks_match = re.search(r'in (\d+) weeks?', date_string)
+    weeks_match = _IN_WEEKS_RE.search(date_string)
     if weeks_match:
         weeks = int(weeks_match.group(1))
-        return (today + timedelta(weeks=weeks)).date().isoformat()
-    
-    # Day of week (e.g., "monday", "next friday")
-    weekdays = {
-        'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-        'friday': 4, 'saturday': 5, 'sunday': 6
-    }
+        return (date.today() + timedelta(weeks=weeks)).isoformat()
     
-    for day_name, day_num in weekdays.items():
-        if day_name in date_string:
-            days_ahead = day_num - today.weekday()
-            if days_ahead <= 0 or 'next' in date_string:
-                days_ahead += 7
-            return (today + timedelta(days=days_ahead)).date().isoformat()
+    # Day of week (e.g., "monday", "next friday") - one scan instead of seven
+    weekday_match = _WEEKDAY_RE.search(date_string)
+    if weekday_match:
+        today = date.today()
+        days_ahead = _WEEKDAYS[weekday_match.group(1)] - today.weekday()
+        if days_ahead <= 0 or 'next' in date_string:
+            days_ahead += 7
+        return (today + timedelta(days=days_ahead)).isoformat()
     
     # Return original if no pattern matched
     return date_string
@@ -73,7 +81,10 @@ def extract_tags(text: str) -> List[str]:
     """
     Extract hashtags from text
     """
-    return re.findall(r'#(\w+)', text)
+    # Most messages have no '#': a C-level membership test skips the regex entirely
+    if '#' not in text:
+        return []
+    return _HASHTAG_RE.findall(text)
 
 def format_task_list(tasks: List[Dict[str, Any]]) -> str:
     """
@@ -82,24 +93,24 @@ def format_task_list(tasks: List[Dict[str, Any]]) -> str:
     if not tasks:
         return "No tasks found."
     
-    output = f"Found {len(tasks)} task(s):\n\n"
+    # Collect fragments and join once; repeated += re-copies the whole string each time
+    parts = [f"Found {len(tasks)} task(s):\n\n"]
     
     for i, task in enumerate(tasks, 1):
-        output += f"{i}. {task['title']}\n"
-        output += f"   Priority: {task['priority']} | Status: {task['status']}\n"
+        parts.append(f"{i}. {task['title']}\n   Priority: {task['priority']} | Status: {task['status']}\n")
         
         if task.get('due_date'):
-            output += f"   Due: {task['due_date']}\n"
+            parts.append(f"   Due: {task['due_date']}\n")
         
         if task.get('category'):
-            output += f"   Category: {task['category']}\n"
+            parts.append(f"   Category: {task['category']}\n")
         
         if task.get('description'):
-            output += f"   Description: {task['description']}\n"
+            parts.append(f"   Description: {task['description']}\n")
         
-        output += f"   ID: {task['id']}\n\n"
+        parts.append(f"   ID: {task['id']}\n\n")
     
-    return output
+    return ''.join(parts)
 
 def get_task_stats(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -116,9 +127,11 @@ def get_task_stats(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
             "completion_rate": 0
         }
     
-    completed = sum(1 for task in tasks if task['status'] == 'completed')
-    in_progress = sum(1 for task in tasks if task['status'] == 'in_progress')
-    todo = sum(1 for task in tasks if task['status'] == 'todo')
+    # One pass over the list instead of one per status
+    counts = Counter(task['status'] for task in tasks)
+    completed = counts['completed']
+    in_progress = counts['in_progress']
+    todo = counts['todo']
     
     return {
         "total": total,
@@ -1,6 +1,10 @@
 import os
+import logging
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Agent hot-path logs are debug-level; set LOG_LEVEL=DEBUG to see them
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"), format="%(levelname)s %(name)s: %(message)s")
+
 import uvicorn
 from api.index import app
 
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# api.agent builds its AsyncOpenAI client at import; no request is ever sent in tests
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+# Module-level singletons (db, auth_service) create their files in the working directory
+os.chdir(tempfile.mkdtemp(prefix="todo-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
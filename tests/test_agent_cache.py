@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+from api.agent import TodoAgent  # noqa: E402
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    vector = np.zeros(384, dtype=np.float32)
+    for word in text.split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 384] += 1.0
+    return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+def make_agent():
+    """TodoAgent with local embeddings and an LLM that numbers its replies"""
+    agent = TodoAgent()
+    calls = []
+
+    async def embed_query(key):
+        return fake_embedding(key)
+
+    async def stream_completion(messages):
+        calls.append(messages)
+        return f"reply {len(calls)}"
+
+    agent.embed_query = embed_query
+    agent.stream_completion = stream_completion
+    return agent, calls
+
+
+def test_reply_cache_is_not_shared_between_users():
+    agent, calls = make_agent()
+
+    async def run():
+        alice = await agent.handle_llm_conversation(agent.get_session("alice"), "what's my name?")
+        bob = await agent.handle_llm_conversation(agent.get_session("bob"), "what's my name?")
+        return alice, bob
+
+    alice, bob = asyncio.run(run())
+    assert alice != bob
+    assert len(calls) == 2
+
+
+def test_reply_cache_respects_prior_context():
+    agent, calls = make_agent()
+    session = agent.get_session("alice")
+
+    async def run():
+        await agent.handle_llm_conversation(session, "should I call the dentist?")
+        first = await agent.handle_llm_conversation(session, "yes")
+        session.clear_history()
+        await agent.handle_llm_conversation(session, "should I cancel the gym?")
+        second = await agent.handle_llm_conversation(session, "yes")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first != second
+    assert len(calls) == 4
+
+
+def test_context_free_reply_is_reused_for_same_user():
+    agent, calls = make_agent()
+    session = agent.get_session("alice")
+
+    async def run():
+        first = await agent.handle_llm_conversation(session, "tell me a joke")
+        session.clear_history()
+        second = await agent.handle_llm_conversation(session, "Tell me a joke ")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(calls) == 1
+
+
+def make_function_agent():
+    """TodoAgent whose LLM answers with a search_tasks call and whose executor records calls"""
+    agent, calls = make_agent()
+    executed = []
+
+    async def stream_completion(messages):
+        calls.append(messages)
+        query = messages[-1]["content"].rsplit(" ", 1)[-1]
+        return '{"function": "search_tasks", "parameters": {"query": "%s"}}' % query
+
+    async def execute_function(username, function_name, parameters):
+        executed.append((username, function_name, dict(parameters)))
+        return {"success": True, "message": "ok"}
+
+    agent.stream_completion = stream_completion
+    agent.execute_function = execute_function
+    return agent, calls, executed
+
+
+def test_function_cache_does_not_replay_other_parameters():
+    agent, calls, executed = make_function_agent()
+
+    # Worst case for a similarity cache: the two messages embed identically
+    async def embed_query(key):
+        return fake_embedding(key.rsplit(" ", 1)[0])
+
+    agent.embed_query = embed_query
+
+    async def run():
+        for message in ("search tasks about gym", "search tasks about groceries"):
+            session = agent.get_session("alice")
+            await agent.handle_llm_conversation(session, message)
+            session.clear_history()
+
+    asyncio.run(run())
+    assert [params["query"] for _, _, params in executed] == ["gym", "groceries"]
+    assert len(calls) == 2
+
+
+def test_function_cache_is_per_user():
+    agent, calls, executed = make_function_agent()
+
+    async def run():
+        await agent.handle_llm_conversation(agent.get_session("alice"), "search tasks about gym")
+        await agent.handle_llm_conversation(agent.get_session("bob"), "search tasks about gym")
+
+    asyncio.run(run())
+    assert [username for username, _, _ in executed] == ["alice", "bob"]
+    assert len(calls) == 2
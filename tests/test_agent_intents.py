@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+from api.agent import _LOCAL_INTENTS, INTENT_LABELS, TodoAgent  # noqa: E402
+
+
+def local_intent(message):
+    for pattern, intent in _LOCAL_INTENTS:
+        if pattern.search(message):
+            return intent
+    return None
+
+
+@pytest.mark.parametrize("message", [
+    "delete task buy milk",
+    "remove the task call mom",
+    "complete task finish report",
+    "mark buy milk as done",
+    "show my tasks",
+])
+def test_task_operations_are_classified_locally(message):
+    assert local_intent(message) == "task_operation"
+
+
+@pytest.mark.parametrize("message", [
+    "complete the tax return by friday urgent",
+    "remove old files from the server tomorrow",
+    "delete spam emails next week",
+])
+def test_creation_requests_are_not_forced_to_task_operation(message):
+    assert local_intent(message) is None
+
+
+class FakeCompletions:
+    """Records each prompt; answers intent prompts with `intent` and title prompts with a title"""
+
+    def __init__(self, intent):
+        self.intent = intent
+        self.prompts = []
+
+    async def create(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        if prompt.endswith("JSON:"):
+            content = '{"intent": "%s", "confidence": "high"}' % self.intent
+        else:
+            content = "llm title"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_chat_agent(local_intent=None, llm_intent="casual"):
+    """TodoAgent whose prototypes place every message in `local_intent` (None: defer to the LLM)"""
+    agent = TodoAgent()
+    completions = FakeCompletions(llm_intent)
+    vector = np.zeros(384, dtype=np.float32)
+    vector[0] = 1.0
+
+    async def embed_query(key):
+        return vector
+
+    async def stream_completion(messages):
+        return "reply"
+
+    agent.embed_query = embed_query
+    agent.stream_completion = stream_completion
+    agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    # Nothing resembles a clean title, so a task would need LLM title extraction
+    agent.__dict__["_title_proto"] = np.zeros(384, dtype=np.float32)
+    protos = np.zeros((len(INTENT_LABELS), 384), dtype=np.float32)
+    if local_intent:
+        protos[INTENT_LABELS.index(local_intent)] = vector
+    agent.__dict__["_intent_protos"] = protos
+    return agent, completions.prompts
+
+
+@pytest.mark.parametrize("message, local", [
+    ("show my tasks", None),
+    ("how was your weekend", "casual"),
+])
+def test_locally_classified_chat_makes_no_title_call(message, local):
+    agent, prompts = make_chat_agent(local_intent=local)
+    asyncio.run(agent.chat("alice", message))
+    assert prompts == []
+
+
+def test_locally_classified_task_extracts_title_after_intent():
+    agent, prompts = make_chat_agent(local_intent="task_creation")
+    asyncio.run(agent.chat("alice", "I really ought to sort out the garage shelves"))
+    assert len(prompts) == 1 and prompts[0].endswith("Output:")
+
+
+def test_title_is_only_speculated_alongside_an_llm_intent_call():
+    agent, prompts = make_chat_agent(llm_intent="task_creation")
+    asyncio.run(agent.chat("alice", "thinking the garden fence could use paint"))
+    assert sorted(p[-5:] for p in prompts) == ["JSON:", "tput:"]
@@ -0,0 +1,44 @@
+import numpy as np
+
+from api import cache as cache_module
+from api.cache import SemanticCache
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_exact_entry_expires_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(ttl=10)
+    cache.put("key", "value", unit(1, 0))
+
+    now[0] = 109.0
+    assert cache.get_exact("key") == "value"
+    assert cache.get_similar(unit(1, 0)) == "value"
+
+    now[0] = 110.0
+    assert cache.get_exact("key") is None
+    assert cache.get_similar(unit(1, 0)) is None
+
+
+def test_similar_lookup_needs_similarity_above_threshold():
+    cache = SemanticCache(threshold=0.9)
+    cache.put("key", "value", unit(1, 0))
+
+    assert cache.get_similar(unit(1, 0.2)) == "value"  # cos ~ 0.98
+    assert cache.get_similar(unit(1, 1)) is None  # cos ~ 0.71
+
+
+def test_exact_cache_evicts_least_recently_used():
+    cache = SemanticCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get_exact("a")
+    cache.put("c", 3)
+
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == 1
+    assert cache.get_exact("c") == 3
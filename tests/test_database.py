@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from api import database as database_module
+from api.database import Database
+
+
+@pytest.fixture
+def tasks_file(tmp_path):
+    return str(tmp_path / "tasks.json")
+
+
+def embedding(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def row_of(db, task):
+    return db.tasks[task.id]["embedding_row"]
+
+
+def test_create_and_delete(tasks_file):
+    db = Database(tasks_file)
+    task = db.create_task("Buy milk", "alice", priority="high")
+
+    assert db.get_task(task.id, "alice").title == "Buy milk"
+    assert db.get_task(task.id, "bob") is None
+    assert not db.delete_task(task.id, "bob")
+
+    assert db.delete_task(task.id, "alice")
+    assert db.get_task(task.id, "alice") is None
+    assert db.get_all_tasks("alice") == []
+
+
+def test_deleted_row_is_reused_only_after_save(tasks_file):
+    db = Database(tasks_file)
+    first = db.create_task("First", "alice", embedding=embedding(1, 0, 0))
+    db.flush()
+    assert row_of(db, first) == 0
+
+    db.delete_task(first.id, "alice")
+    # tasks.json on disk still points at row 0 until the delete is written
+    second = db.create_task("Second", "alice", embedding=embedding(0, 1, 0))
+    assert row_of(db, second) == 1
+
+    db.flush()
+    third = db.create_task("Third", "alice", embedding=embedding(0, 0, 1))
+    assert row_of(db, third) == 0
+    db.flush()
+
+    results = db.semantic_search([0, 0, 1], "alice", threshold=0.9)
+    assert [t.id for t in results] == [third.id]
+
+
+def test_embedding_store_grows_past_capacity(tasks_file, monkeypatch):
+    monkeypatch.setattr(database_module, "EMBEDDING_CAPACITY", 2)
+    db = Database(tasks_file)
+    tasks = [
+        db.create_task(f"Task {i}", "alice", embedding=embedding(*np.eye(3)[i]))
+        for i in range(3)
+    ]
+    db.flush()
+
+    assert db._emb_mmap.shape[0] == 4
+    for i, task in enumerate(tasks):
+        results = db.semantic_search(np.eye(3)[i], "alice", threshold=0.9)
+        assert [t.id for t in results] == [task.id]
+
+
+def test_other_instance_sees_saved_changes(tasks_file, monkeypatch):
+    monkeypatch.setattr(database_module, "EMBEDDING_CAPACITY", 1)
+    writer = Database(tasks_file)
+    first = writer.create_task("First", "alice", embedding=embedding(1, 0))
+    writer.flush()
+
+    reader = Database(tasks_file)
+    assert [t.id for t in reader.get_all_tasks("alice")] == [first.id]
+    assert [t.id for t in reader.semantic_search([1, 0], "alice", threshold=0.9)] == [first.id]
+
+    # The writer grows (replaces) the sidecar; the reader must reopen it, not read a stale map
+    second = writer.create_task("Second", "alice", embedding=embedding(0, 1))
+    writer.flush()
+
+    assert {t.id for t in reader.get_all_tasks("alice")} == {first.id, second.id}
+    assert [t.id for t in reader.semantic_search([0, 1], "alice", threshold=0.9)] == [second.id]
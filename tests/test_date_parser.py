@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import pytest
+
+from api.date_parser import DateParser
+
+# A Wednesday
+BASE = datetime(2025, 10, 29, 9, 30)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("today", "2025-10-29"),
+    ("tomorrow", "2025-10-30"),
+    ("call mom day after tomorrow", "2025-10-31"),
+    ("next week", "2025-11-05"),
+    ("in 3 days", "2025-11-01"),
+    ("in 1 day", "2025-10-30"),
+])
+def test_relative_days(text, expected):
+    assert DateParser.parse_relative_date(text, BASE) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("next friday", "2025-10-31"),
+    ("next monday", "2025-11-03"),
+    ("next wednesday", "2025-11-05"),  # same weekday rolls over a full week
+])
+def test_next_weekday(text, expected):
+    assert DateParser.parse_relative_date(text, BASE) == expected
+
+
+def test_explicit_dates_and_no_match():
+    assert DateParser.parse_relative_date("due 28/10/2025", BASE) == "2025-10-28"
+    assert DateParser.parse_relative_date("buy milk", BASE) is None
@@ -0,0 +1,47 @@
+import pytest
+from rapidfuzz import fuzz
+from rapidfuzz.distance import OSA
+
+from api.nlp_utils import NLPUtils
+
+extract_priority = NLPUtils.extract_priority.__wrapped__
+
+
+@pytest.mark.parametrize("message, priority", [
+    ("buy milk urgnet", "urgent"),
+    ("imediate fix needed", "urgent"),
+    ("call bob importnat", "high"),
+    ("pay rent normall", "medium"),
+    ("high priority: call bob urgent", "urgent"),
+])
+def test_priority_typos_are_matched_per_word(message, priority):
+    assert extract_priority(message) == priority
+
+
+@pytest.mark.parametrize("message", [
+    "remind me to call mom",
+    "email the landlord about rent",
+    "this is fine",
+    "fill out the tax form",
+    "clean up the mess",
+    "clean the dorm",
+    "buy a new lens",
+    "meeting at noon",
+    "buy moon cake",
+    "import the files",
+    "water plants",
+    "send the media kit",
+])
+def test_ordinary_words_do_not_fuzzy_match_a_priority(message):
+    assert extract_priority(message) is None
+
+
+def test_fuzzy_match_takes_cutoff_in_scorer_units():
+    titles = ["Buy Milk", "Call the dentist"]
+    assert NLPUtils.fuzzy_match("buy mlk", titles) == "Buy Milk"
+    assert NLPUtils.fuzzy_match("dentist", titles, scorer=fuzz.WRatio) == "Call the dentist"
+    assert NLPUtils.fuzzy_match("dentist", titles) is None
+
+    synonyms = ["urgent", "important"]
+    assert NLPUtils.fuzzy_match("urgnet", synonyms, 0.8, scorer=OSA.normalized_similarity) == "urgent"
+    assert NLPUtils.fuzzy_match("import", synonyms, 0.8, scorer=OSA.normalized_similarity) is None
@@ -0,0 +1,21 @@
+from datetime import date, timedelta
+
+from api.tools import parse_relative_date
+
+
+def test_in_n_days_and_weeks():
+    today = date.today()
+    assert parse_relative_date("in 3 days") == (today + timedelta(days=3)).isoformat()
+    assert parse_relative_date("in 2 weeks") == (today + timedelta(weeks=2)).isoformat()
+
+
+def test_weekday_is_next_occurrence():
+    result = date.fromisoformat(parse_relative_date("friday"))
+    assert result.weekday() == 4
+    assert 1 <= (result - date.today()).days <= 7
+
+
+def test_patterns_only_match_whole_words():
+    # Both used to match inside longer words ("beg*in 3 days*heet", "*monday*s")
+    assert parse_relative_date("begin 3 daysheet") == "begin 3 daysheet"
+    assert parse_relative_date("mondays") == "mondays"